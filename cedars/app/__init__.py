@@ -64,6 +64,18 @@ def create_app(config_filename=None):
 
     setup_logging()
 
+    @cedars_app.cli.command("create-indexes")
+    def create_indexes_command():
+        """Create the CEDARS database indexes."""
+        # Building indexes on large existing collections can take a while,
+        # so they are built here rather than on the request path.
+        ops.db.create_db_indices()
+
+    @cedars_app.cli.command("round-pines-scores")
+    def round_pines_scores_command():
+        """Round PINES prediction scores saved by older versions."""
+        ops.db.round_pines_scores()
+
     @cedars_app.route('/', methods=["GET"])
     def homepage():
         if auth.current_user.is_authenticated and auth.current_user.is_admin:
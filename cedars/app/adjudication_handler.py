@@ -145,7 +145,7 @@ class AdjudicationHandler:
         # Note that this is not the same as having all the annotatings
         # being reviewed as annotations that are unreviewed but after the event date
         # can be marked None to indicate that they do not need to be annotated.
-        return self.patient_data['review_statuses'].count(ReviewStatus.UNREVIEWED) == 0
+        return ReviewStatus.UNREVIEWED not in self.patient_data['review_statuses']
 
     def perform_shift(self, action):
         '''
@@ -193,14 +193,12 @@ class AdjudicationHandler:
             # show the next annotation by default
             return new_index
 
-        while True:
-            if review_statuses[new_index] == ReviewStatus.UNREVIEWED:
-                self.patient_data['current_index'] = new_index
-                break
-
-            new_index += 1
-            if new_index >= last_index:
-                new_index = 0
+        # list.index scans in C; wrap around to the start if nothing is left after index
+        try:
+            new_index = review_statuses.index(ReviewStatus.UNREVIEWED, index + 1)
+        except ValueError:
+            new_index = review_statuses.index(ReviewStatus.UNREVIEWED)
+        self.patient_data['current_index'] = new_index
 
 
     def mark_event_date(self, event_date, event_annotation_id, annotations_after_event):
@@ -263,6 +261,14 @@ class AdjudicationHandler:
         return res
 
 class AnnotationFilterStrategy:
+    @staticmethod
+    def _normalize_sentence(sentence):
+        '''
+        Normalizes a sentence for duplicate detection. Case and whitespace
+        (including line breaks inside the sentence) are ignored.
+        '''
+        return " ".join(sentence.lower().split())
+
     def _filter_duplicates_by_patient(self, annotations):
         '''
         Finds and returns indices for duplicate sentences across any note
@@ -272,7 +278,7 @@ class AnnotationFilterStrategy:
         indices_with_duplicates = []
         seen_sentences = set()
         for i, annotation in enumerate(annotations):
-            sentence = annotation['sentence'].lower().strip()
+            sentence = self._normalize_sentence(annotation['sentence'])
             if sentence in seen_sentences:
                 indices_with_duplicates.append(i)
                 continue
@@ -298,7 +304,7 @@ class AnnotationFilterStrategy:
                 seen_sentences.clear()
 
             prev_note_id = annotation['note_id']
-            sentence = annotation['sentence'].lower().strip()
+            sentence = self._normalize_sentence(annotation['sentence'])
             if sentence in seen_sentences:
                 indices_with_duplicates.append(i)
                 continue
@@ -314,13 +320,13 @@ class AnnotationFilterStrategy:
         IDs of these indices are also stored and returned in a seperate list.
         '''
 
-        annotations_with_duplicates = []
-        # Remove the indices in reverse order to avoid a later index changing
-        # after a prior one is removed.
-        indices_with_duplicates.sort(reverse=True)
-        for index in indices_with_duplicates:
-            annotations_with_duplicates.append(annotations[index]["_id"])
-            annotations.pop(index)
+        # Build the kept list in a single pass instead of popping each
+        # duplicate, which shifts the rest of the list every time.
+        duplicates = set(indices_with_duplicates)
+        annotations_with_duplicates = [annotations[index]["_id"]
+                                       for index in sorted(duplicates)]
+        annotations = [annotation for i, annotation in enumerate(annotations)
+                       if i not in duplicates]
 
         return annotations, annotations_with_duplicates
 
@@ -362,7 +368,6 @@ class SentenceHighlighter:
         text = note["text"]
 
         annotations = annotations_for_note
-        logger.debug(annotations)
 
         for annotation in annotations:
             start_index = annotation['note_start_index']
@@ -376,8 +381,7 @@ class SentenceHighlighter:
             prev_end_index = end_index
 
         highlighted_note.append(text[prev_end_index:])
-        logger.debug(highlighted_note)
-        return " ".join(highlighted_note).replace("\n", "<br>")
+        return "".join(highlighted_note).replace("\n", "<br>")
 
     def get_highlighted_sentence(self, current_annotation, note, annotations_for_sentence):
         """
@@ -386,8 +390,16 @@ class SentenceHighlighter:
         highlighted_note = []
         text = note["text"]
 
-        sentence_start = text.lower().index(current_annotation['sentence'])
-        sentence_end = sentence_start + len(current_annotation['sentence'])
+        sentence = current_annotation['sentence']
+        sentence_start = current_annotation.get('sentence_start')
+        sentence_end = None
+        if sentence_start is not None:
+            sentence_end = sentence_start + len(sentence)
+        # Annotations created before sentence offsets were exact may point
+        # elsewhere, so only trust the offset if the sentence is found there.
+        if sentence_end is None or text[sentence_start:sentence_end].lower() != sentence:
+            sentence_start = text.lower().index(sentence)
+            sentence_end = sentence_start + len(sentence)
         prev_end_index = sentence_start
 
         annotations = annotations_for_sentence
@@ -1,9 +1,57 @@
 import os
+import time
 from loguru import logger
-from tenacity import retry, wait_exponential
+from tenacity import retry, stop_after_delay, wait_exponential
 import requests
+from requests.adapters import HTTPAdapter
 from . import db
 
+# Healthy PINES servers are not re-checked for this many seconds.
+HEALTHCHECK_CACHE_SECONDS = 600
+
+# (connect, read) timeout in seconds for every request made from this module,
+# so that an unresponsive server cannot block a worker indefinitely.
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Stop waiting for a PINES server to start up via the superbio API after this many seconds.
+PINES_STARTUP_TIMEOUT = 3600
+
+# Shared session so that calls to the PINES and superbio servers
+# reuse open connections instead of doing a new TCP/TLS handshake each time.
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+# Maps a PINES url to the time of its last successful healthcheck.
+_healthy_pines_urls = {}
+
+
+def get_pines_health_status(pines_api_url):
+    '''
+    Returns the status reported by the healthcheck endpoint of a PINES server.
+    A healthy result is cached for HEALTHCHECK_CACHE_SECONDS so that repeated
+    checks of the same server do not each make a request.
+
+    Args :
+        - pines_api_url (str) : The url of the PINES server.
+
+    Returns :
+        - status (str) : The status of the server, 'Healthy' if it is running.
+    '''
+    last_healthy = _healthy_pines_urls.get(pines_api_url)
+    if last_healthy is not None and time.monotonic() - last_healthy < HEALTHCHECK_CACHE_SECONDS:
+        return 'Healthy'
+
+    health_check = _session.get(f'{pines_api_url}/healthcheck', timeout=REQUEST_TIMEOUT)
+    status = health_check.json()['status']
+    if status == 'Healthy':
+        _healthy_pines_urls[pines_api_url] = time.monotonic()
+    else:
+        _healthy_pines_urls.pop(pines_api_url, None)
+
+    return status
+
 def load_pines_url(project_id, superbio_api_token = None):
     '''
     if PINES_URL is not available in the ENV then
@@ -36,11 +84,10 @@ def load_pines_url(project_id, superbio_api_token = None):
         logger.info(f"Received url : {pines_api_url} for pines from ENV variables.")
 
         try:
-            health_check = requests.get(f'{pines_api_url}/healthcheck')
-            health_check = health_check.json()
-            if health_check['status'] != 'Healthy':
+            health_status = get_pines_health_status(pines_api_url)
+            if health_status != 'Healthy':
                 raise Exception(f'''Issue found while performing healthcheck on the 
-                                PINES server {pines_api_url}, got status : {health_check["status"]}.''')
+                                PINES server {pines_api_url}, got status : {health_status}.''')
         except requests.exceptions.HTTPError as e:
             logger.error(f'Connection failed when trying to check status of PINES server {pines_api_url} : {e}.')
             return None, False
@@ -50,6 +97,9 @@ def load_pines_url(project_id, superbio_api_token = None):
         except requests.exceptions.ConnectionError as e:
             logger.error(f'Could not connect to server {pines_api_url} to access PINES.')
             return None, False
+        except requests.exceptions.Timeout as e:
+            logger.error(f'Timed out waiting for PINES server {pines_api_url}.')
+            return None, False
 
 
     elif api_url is not None:
@@ -65,7 +115,8 @@ def load_pines_url(project_id, superbio_api_token = None):
 
         logger.info("Pinging", f'{api_url}/{endpoint}')
         logger.info("With header : ", headers, flush=True)
-        response = requests.post(f'{api_url}/{endpoint}', headers=headers, data={})
+        response = _session.post(f'{api_url}/{endpoint}', headers=headers, data={},
+                                 timeout=REQUEST_TIMEOUT)
         logger.info("POST responce", response, flush=True)
 
         if response.status_code != 200:
@@ -80,7 +131,8 @@ def load_pines_url(project_id, superbio_api_token = None):
 
     return pines_api_url, is_url_from_api
 
-@retry(wait=wait_exponential(multiplier=1, min=4, max=600))
+@retry(wait=wait_exponential(multiplier=1, min=4, max=600),
+       stop=stop_after_delay(PINES_STARTUP_TIMEOUT))
 def load_pines_from_api(api_url, endpoint, headers):
     '''
     Gets the PINES url from an api using a get request.
@@ -97,7 +149,7 @@ def load_pines_from_api(api_url, endpoint, headers):
         - headers (dict) : Any headers to provide with the request (such as passing a token).
     '''
     logger.info("Sending GET request to", f'{api_url}/{endpoint}', flush=True)
-    data = requests.get(f'{api_url}/{endpoint}', headers=headers)
+    data = _session.get(f'{api_url}/{endpoint}', headers=headers, timeout=REQUEST_TIMEOUT)
     json_data = data.json()
     logger.info("Got JSON", json_data, flush=True)
     return json_data['url']
@@ -137,7 +189,8 @@ def get_token_status(superbio_api_token):
     endpoint = "cedars_projects"
     headers = {"Authorization": f"Bearer {superbio_api_token}"}
     try:
-        response = requests.get(f'{api_url}/{endpoint}', headers=headers)
+        response = _session.get(f'{api_url}/{endpoint}', headers=headers,
+                                timeout=REQUEST_TIMEOUT)
         data = response.json()
         if 'hits' in data:
             result['is_valid'] = True
@@ -152,6 +205,9 @@ def get_token_status(superbio_api_token):
     except requests.exceptions.ConnectionError as e:
         logger.error(f'Could not connect to superbio server to check token validity.')
         result['token_info'] = f"Encountered Connection error {e}."
+    except requests.exceptions.Timeout as e:
+        logger.error(f'Timed out when trying to check token validity.')
+        result['token_info'] = f"Encountered Timeout error {e}."
 
     return result
 
@@ -175,7 +231,8 @@ def kill_pines_api(project_id, superbio_api_token):
             headers = {"Authorization": f"Bearer {superbio_api_token}"}
 
             try:
-                requests.delete(f'{api_url}/{endpoint}', headers=headers)
+                _session.delete(f'{api_url}/{endpoint}', headers=headers,
+                                timeout=REQUEST_TIMEOUT)
             # TODO : Handle more types of exceptions
             # Might retry in case of certain exceptions
             except Exception as e:
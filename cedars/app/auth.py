@@ -24,7 +24,7 @@ from flask_login import (
 )
 from dotenv import load_dotenv
 from loguru import logger
-from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.security import check_password_hash
 from passvalidate import PasswordPolicy
 from bson import ObjectId
 from . import db
@@ -120,7 +120,6 @@ def register():
             error = "\n".join(password_issues)
 
         if error is None:
-            hashed_password = generate_password_hash(password)
             # Making the first registered user an admin
             is_first_user = not len(db.get_project_users()) > 0
 
@@ -134,7 +133,7 @@ def register():
 
             db.add_user(
                 username=username,
-                password=hashed_password,
+                password=password,
                 is_admin=is_admin)
 
             flash('Registration successful.')
@@ -142,8 +141,9 @@ def register():
                 project_id = os.getenv("PROJECT_ID")
                 if project_id is None:
                     project_id=str(uuid4())
-                db.create_project(project_name=db.fake.slug(),
-                            investigator_name=db.fake.name(),
+                fake = db.get_fake()
+                db.create_project(project_name=fake.slug(),
+                            investigator_name=fake.name(),
                             project_id = project_id)
                 logger.info("Initialized project.")
                 login_user(User(db.get_user(username)))
@@ -221,7 +221,7 @@ def token_login():
             # Create a new user with data from the external API
             db.add_user(
                 username=username,
-                password=generate_password_hash(token),  # Store hashed token as password
+                password=token,  # Stored as a hash by add_user
                 is_admin=True if "admin" in user_data["user"].get('institution_roles') else False
             )
         user = User(db.get_user(username))
@@ -1,6 +1,7 @@
 """Initialize database connection."""
 import os
 import flask_pymongo
+import urllib3
 from minio import Minio
 from werkzeug.local import LocalProxy
 from dotenv import dotenv_values
@@ -10,13 +11,39 @@ from loguru import logger
 
 config = dotenv_values(".env")
 
+# (pid, PoolManager) shared by the minio clients of a process
+_minio_http = None
+
 
 def get_mongo():
     # https://pymongo.readthedocs.io/en/stable/faq.html#is-pymongo-fork-safe
+    # A client (and its connection pool) is created once per process and app,
+    # so forked gunicorn/rq workers never share sockets with their parent.
+    pid = os.getpid()
+    cached = current_app.extensions.get("cedars_mongo")
+    if cached is not None and cached[0] == pid:
+        return cached[1]
     mongo = flask_pymongo.PyMongo(current_app)
+    current_app.extensions["cedars_mongo"] = (pid, mongo)
     return mongo
 
 
+def get_minio_http():
+    # Minio creates a new connection pool for every client, and a client is made
+    # for every app context. Share one pool per process instead so connections
+    # are reused across requests and jobs.
+    global _minio_http
+    pid = os.getpid()
+    if _minio_http is None or _minio_http[0] != pid:
+        _minio_http = (pid, urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=300, read=300),
+            maxsize=50,
+            retries=urllib3.Retry(total=5, backoff_factor=0.2,
+                                  status_forcelist=[500, 502, 503, 504])
+        ))
+    return _minio_http[1]
+
+
 def get_minio():
     minio = getattr(g, "minio", None)
     from . import db
@@ -31,7 +58,8 @@ def get_minio():
             f'{config["MINIO_HOST"]}:{config["MINIO_PORT"]}',
             access_key=config["MINIO_ACCESS_KEY"],
             secret_key=config["MINIO_SECRET_KEY"],
-            secure=False  # should be true for prod or AWS
+            secure=False,  # should be true for prod or AWS
+            http_client=get_minio_http()
         )
         if not minio.bucket_exists(g.bucket_name):
             minio.make_bucket(g.bucket_name)
@@ -3,31 +3,79 @@ This file contatins an abstract class for CEDARS to interact with mongodb.
 """
 
 import os
+import time
+import hashlib
 from io import BytesIO, StringIO
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from uuid import uuid4
 
+from functools import partial
+from itertools import islice
 from typing import Optional
-from faker import Faker
-from pymongo import UpdateOne
-from pymongo.errors import BulkWriteError
+from pymongo import IndexModel, UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError, PyMongoError
 import flask
 from flask import g
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import polars as pl
-from werkzeug.security import check_password_hash
+from werkzeug.security import check_password_hash, generate_password_hash
 from bson import ObjectId
 from loguru import logger
 from .database import mongo, minio
 from .cedars_enums import ReviewStatus
 
 
-fake = Faker()
+_fake = None
 
 logger.enable(__name__)
 
+# The INFO document is read on almost every page render but rarely changes,
+# so it is kept in memory for a short time. Updates made by other processes
+# are seen after at most INFO_CACHE_SECONDS.
+INFO_CACHE_SECONDS = 5
+_info_cache = {"info": None, "expires_at": 0.0}
+
+# Masks digits in note excerpts written to the logs
+_DIGITS = re.compile(r'\d')
+
+# Administrative resets are idempotent and can be re-run, so they only
+# wait for the primary to acknowledge instead of a majority.
+_PRIMARY_ACK = WriteConcern(w=1)
+
+# Number of PINES predictions written to the database at once.
+PINES_BATCH_SIZE = 500
+# Notes sent to the PINES server concurrently, and the number of threads used.
+PINES_CHUNK_SIZE = 64
+PINES_MAX_WORKERS = 16
+
+# Shared keep-alive connections to the PINES server for predictions.
+# Prediction requests are idempotent, so transient gateway errors are retried.
+_pines_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32,
+                             max_retries=Retry(total=3, backoff_factor=0.2,
+                                               status_forcelist=(502, 503, 504),
+                                               allowed_methods=frozenset({"POST"})))
+_pines_session = requests.Session()
+_pines_session.mount("https://", _pines_adapter)
+_pines_session.mount("http://", _pines_adapter)
+
+def get_fake():
+    """
+    Returns a shared Faker instance, created on first use.
+    Faker loads all of its locale providers when constructed, so this is
+    deferred until a placeholder project name is actually needed.
+    """
+    global _fake  # pylint: disable=W0603
+    if _fake is None:
+        from faker import Faker  # pylint: disable=C0415
+        _fake = Faker()
+    return _fake
+
+
 # Create collections and indexes
 def create_project(project_name,
                    investigator_name,
@@ -44,7 +92,7 @@ def create_project(project_name,
         None
     """
     create_db_indices()
-    if mongo.db["INFO"].find_one() is not None:
+    if mongo.db["INFO"].estimated_document_count() > 0:
         logger.info("Database already created.")
         return
 
@@ -92,70 +140,107 @@ def create_info_col(project_name,
             "CEDARS_version": cedars_version}
 
     collection.insert_one(info)
+    clear_info_cache()
     logger.info("Created INFO collection.")
 
 
 # index functions
-def create_index(collection, index: list):
-    """
-    This function is used to create an index in a collection
-    Add support for features such as unique=True etc
+DB_INDEXES = {
+    "NOTES": [
+        IndexModel([("text_id", 1)], unique=True),
+        IndexModel([("patient_id", 1), ("text_id", 1)], unique=True),
+        # Used by get_patient_notes and the per-patient reviewed note counts
+        IndexModel([("patient_id", 1), ("reviewed", 1), ("text_date", 1)]),
+    ],
+    "PATIENTS": [
+        IndexModel([("patient_id", 1)], unique=True),
+        # Used by get_patient and get_patient_ids to find the next patient to review
+        IndexModel([("reviewed", 1), ("locked", 1), ("index_no", 1)],
+                   partialFilterExpression={"reviewed": False, "locked": False}),
+    ],
+    "ANNOTATIONS": [
+        # Single-field patient_id and note_id lookups use the
+        # prefixes of the compound indexes below.
+        IndexModel([("text_date", 1)]),
+        IndexModel([("reviewed", 1)]),
+        IndexModel([("patient_id", 1), ("isNegated", 1), ("text_date", 1),
+                    ("note_id", 1), ("note_start_index", 1)]),
+        # Used by get_patient_annotation_ids
+        IndexModel([("patient_id", 1), ("isNegated", 1), ("reviewed", 1),
+                    ("note_id", 1), ("text_date", 1), ("sentence_number", 1)]),
+        # Used by get_all_annotations_for_note and the per-note review counts
+        IndexModel([("note_id", 1), ("isNegated", 1), ("text_date", 1),
+                    ("note_start_index", 1)]),
+        # Used by get_annotations_post_event and mark_annotations_post_event
+        IndexModel([("patient_id", 1), ("reviewed", 1), ("text_date", 1)]),
+    ],
+    "PINES": [
+        IndexModel([("text_id", 1)], unique=True),
+        # Covers the score lookups in get_note_prediction(s)_from_db
+        IndexModel([("text_id", 1), ("predicted_score", 1)]),
+        IndexModel([("patient_id", 1)]),
+        # Used by get_note_predictions_by_hash (via _predict_notes) to reuse
+        # predictions for identical text
+        IndexModel([("text_hash", 1), ("predicted_score", 1)]),
+    ],
+    "USERS": [
+        IndexModel([("user", 1)], unique=True),
+    ],
+    "RESULTS": [
+        IndexModel([("patient_id", 1)], unique=True),
+    ],
+    "NOTES_SUMMARY": [
+        IndexModel([("patient_id", 1)]),
+    ],
+    "TASK": [
+        IndexModel([("job_id", 1)], unique=True),
+        # Used by count_tasks_in_progress when jobs finish
+        IndexModel([("complete", 1)]),
+    ],
+}
+
+
+def create_collection_indices(collection):
+    '''
+    Creates all the indices listed in DB_INDEXES for one collection
+    with a single createIndexes command. Indices that already exist are left as is.
 
     Args:
-        collection (str) : The name of the collection to create the index in.
-        index (str|tuple) : The name of the index to create or a tuple with the name and options.
+        collection (str) : The name of the collection to create the indices in.
+    '''
+    logger.info(f"Creating indexes for {collection}.")
+    mongo.db[collection].create_indexes(DB_INDEXES[collection])
 
-    """
-    for i in index:
-        if isinstance(i, tuple):
-            mongo.db[collection].create_index(i[0], **i[1])
-        else:
-            mongo.db[collection].create_index(i)
-        logger.info(f"Created index {i} in collection {collection}.")
 
 def create_db_indices():
     '''
-    Creates indices for the ANNOTATIONS and PINES cols in the db.
+    Creates indices for all the CEDARS collections in the db.
+    A failure for one collection (e.g. a conflicting index created by hand)
+    is logged and does not stop the other collections from being indexed.
     '''
-    logger.info("All tasks completed.")
-
-    logger.info("Creating indexes for NOTES.")
-    mongo.db["NOTES"].create_index([("text_id", 1 )], unique=True)
-    mongo.db["NOTES"].create_index([("patient_id", 1)])
-    mongo.db["NOTES"].create_index([("patient_id", 1), ("text_id", 1)], unique=True)
-
-    logger.info("Creating indexes for PATIENTS.")
-    mongo.db["PATIENTS"].create_index([("patient_id", 1)], unique=True)
-
-    logger.info("Creating indexes for ANNOTATIONS.")
-    create_index("ANNOTATIONS", ["patient_id", "note_id"])
-    mongo.db["ANNOTATIONS"].create_index([("patient_id", 1), ("isNegated", 1),
-                                        ("text_date", 1), ("note_id", 1), ("note_start_index", 1) ] )
-    create_index("ANNOTATIONS", ["patient_id", "text_date", "reviewed"])
-    create_index("ANNOTATIONS", ["note_id", "reviewed"])
-    create_index("ANNOTATIONS", ["patient_id", "reviewed"])
-
-    logger.info("Creating indexes for PINES.")
-    create_index("PINES", [("text_id", {"unique": True})])
-    create_index("PINES", [("patient_id")])
-
-    logger.info("Creating indexes for USERS.")
-    create_index("USERS", [("user", {"unique": True})])
+    for collection in DB_INDEXES:
+        try:
+            create_collection_indices(collection)
+        except PyMongoError as e:
+            logger.error(f"Could not create indexes for {collection}: {e}")
 
-    logger.info("Creating indexes for RESULTS.")
-    create_index("RESULTS", [("patient_id", {"unique": True})])
-
-    logger.info("Creating indexes for NOTES_SUMMARY.")
-    create_index("NOTES_SUMMARY", [("patient_id")])
+# Insert functions
+def hash_password(password):
+    """
+    Hashes a password with the method and salt length set in the app config.
 
-    logger.info("Creating indexes for USERS.")
-    create_index("USERS", [("user", {"unique": True})])
+    Args:
+        password (str) : The plain text password.
+    Returns:
+        password_hash (str) : The werkzeug password hash.
+    """
+    app_config = flask.current_app.config
+    return generate_password_hash(password,
+                                  method=app_config.get("PASSWORD_HASH_METHOD", "scrypt"),
+                                  salt_length=app_config.get("PASSWORD_SALT_LENGTH", 16))
 
-    logger.info("Creating indexes for TASK.")
-    create_index("TASK", [("job_id", {"unique": True})])
 
-# Insert functions
-def add_user(username, password, is_admin=False):
+def add_user(username, password, is_admin=False, is_hashed=False):
     """
     This function is used to add a new user to the database.
     All this data is kept in the USERS collection.
@@ -163,9 +248,15 @@ def add_user(username, password, is_admin=False):
     Args:
         username (str) : The name of this user.
         password (str) : The password this user will need to login to the system.
+        is_admin (bool) : True if the user is an admin.
+        is_hashed (bool) : True if password is already a werkzeug hash
+            and must be stored as is.
     Returns:
         None
     """
+    if not is_hashed:
+        password = hash_password(password)
+
     info = {
         "user": username,
         "password": password,
@@ -287,13 +378,32 @@ def update_notes_summary():
 
 
 def bulk_insert_notes(notes):
+    '''
+    Inserts a batch of notes into the NOTES collection in a single round-trip.
+
+    Duplicate notes are rejected by the unique index on text_id, so no
+    existence check is done beforehand. The insert is unordered so that a
+    duplicate does not stop the rest of the batch from being written.
+
+    Args :
+        - notes (list[dict]) : Notes to insert.
+
+    Returns :
+        - inserted_count (int) : Number of notes that were inserted.
+    '''
     notes_collection = mongo.db["NOTES"]
     try:
-        result = notes_collection.insert_many(notes)
+        result = notes_collection.insert_many(notes, ordered=False)
         logger.info(f"Inserted {len(result.inserted_ids)} notes.")
         return len(result.inserted_ids)
     except BulkWriteError as bwe:
-        logger.error(f"Bulk write error: {bwe.details}")
+        write_errors = bwe.details.get('writeErrors', [])
+        # Error code 11000 is a duplicate key error, these notes already exist.
+        duplicates = [error for error in write_errors if error.get('code') == 11000]
+        if len(duplicates) > 0:
+            logger.info(f"Skipped {len(duplicates)} notes that already exist.")
+        if len(duplicates) < len(write_errors):
+            logger.error(f"Bulk write error: {bwe.details}")
         return bwe.details['nInserted']
 
 
@@ -485,8 +595,7 @@ def upsert_patient_records(patient_id: str, insert_datetime: datetime = None, up
     sentences = reviewed_sentences + unreviewed_sentences
 
 
-    event_date = get_event_date(patient_id)
-    key_annotation_id = get_event_annotation_id(patient_id)
+    event_date, key_annotation_id = get_patient_event(patient_id)
     event_information = ""
     if event_date and key_annotation_id:
         key_annotation = get_annotation(key_annotation_id)
@@ -561,7 +670,8 @@ def get_search_query(query_key="query"):
     This function is used to get the current search query from the database.
     All this data is kept in the QUERY collection.
     """
-    query = mongo.db["QUERY"].find_one({"current": True})
+    query = mongo.db["QUERY"].find_one({"current": True},
+                                       {"_id": 0, query_key: 1})
 
     if query:
         return query[query_key]
@@ -583,19 +693,45 @@ def get_search_query_details():
     return {}
 
 
+def clear_info_cache():
+    """
+    Drops the cached INFO document so the next read goes to the database.
+    """
+    _info_cache["info"] = None
+    _info_cache["expires_at"] = 0.0
+
+
+def _get_cached_info():
+    """
+    Returns the INFO document, reading it from the database at most
+    once every INFO_CACHE_SECONDS.
+
+    Returns:
+        info (dict) : The INFO document or None if the project is not created.
+    """
+    now = time.monotonic()
+    if _info_cache["info"] is None or now >= _info_cache["expires_at"]:
+        info = mongo.db["INFO"].find_one()
+        if info is None:
+            return None
+        _info_cache["info"] = info
+        _info_cache["expires_at"] = now + INFO_CACHE_SECONDS
+    return _info_cache["info"]
+
+
 def get_info():
     """
     This function returns the info collection in the mongodb database.
     """
-    info = mongo.db["INFO"].find_one()
+    info = _get_cached_info()
 
     if info is not None:
-        return info
+        return dict(info)
 
     return {}
 
 
-def get_all_annotations_for_note(note_id):
+def get_all_annotations_for_note(note_id, projection=None):
     """
     This function is used to get all the annotations for a particular note
     after removing negated annotations.
@@ -604,11 +740,12 @@ def get_all_annotations_for_note(note_id):
         note_start_index (ascending)
     """
     annotations = mongo.db["ANNOTATIONS"].find({"note_id": note_id,
-                                                "isNegated": False}).sort([("text_date", 1),
-                                                                           ("setence_number", 1)])
+                                                "isNegated": False},
+                                               projection).sort([("text_date", 1),
+                                                                 ("note_start_index", 1)])
     return list(annotations)
 
-def get_all_annotations_for_sentence(note_id, sentence_number):
+def get_all_annotations_for_sentence(note_id, sentence_number, projection=None):
     """
     This function is used to get all the annotations for a particular sentence
         in a note after removing negated annotations.
@@ -618,8 +755,9 @@ def get_all_annotations_for_sentence(note_id, sentence_number):
     """
     annotations = mongo.db["ANNOTATIONS"].find({"note_id": note_id,
                                                 "sentence_number" : sentence_number,
-                                                "isNegated": False}).sort([("text_date", 1),
-                                                                           ("note_start_index", 1)])
+                                                "isNegated": False},
+                                               projection).sort([("text_date", 1),
+                                                                 ("note_start_index", 1)])
     return list(annotations)
 
 def get_annotation(annotation_id):
@@ -638,19 +776,22 @@ def get_annotation(annotation_id):
     return annotation
 
 
-def get_annotation_note(annotation_id: str):
+def get_annotation_note(annotation_id: str, annotation: Optional[dict] = None):
     """
     Retrives note linked to a paticular annotation.
 
     Args:
         annotation_id (str) : Unique ID for the annotation.
+        annotation (dict) : The annotation, if the caller already fetched it.
     Returns:
         note (dict) : Dictionary for a note from mongodb.
                       The keys are the attribute names.
                       The values are the values of the attribute in that record.
     """
-    logger.debug(f"Retriving annotation #{annotation_id} from database.")
-    annotation = mongo.db["ANNOTATIONS"].find_one({"_id": ObjectId(annotation_id)})
+    if annotation is None:
+        logger.debug(f"Retriving annotation #{annotation_id} from database.")
+        annotation = mongo.db["ANNOTATIONS"].find_one({"_id": ObjectId(annotation_id)},
+                                                      {"_id": 0, "note_id": 1})
     if not annotation:
         return None
 
@@ -696,12 +837,10 @@ def get_patient():
     # mongodb will ignore this command if index_no does not exist.
     # This is improtant for backwards compatibility,
     # as the index_no will not be present in older CEDARS versions.
-    patient = mongo.db["PATIENTS"].find({"reviewed": False,
-                                             "locked": False}).sort([("index_no", 1)]).limit(1)
-
-    # Extract the first record as we only retrived one patient due to limit(1)
-    patient = list(patient)[0]
-
+    patient = mongo.db["PATIENTS"].find_one({"reviewed": False,
+                                             "locked": False},
+                                            {"_id": 0, "patient_id": 1},
+                                            sort=[("index_no", 1)])
 
     if patient is not None and "patient_id" in patient.keys():
         logger.debug(f"Retriving patient #{patient['patient_id']} from database.", )
@@ -722,10 +861,17 @@ def get_patients_to_annotate():
     """
     logger.debug("Retriving all un-reviewed patients from database.")
 
+    patients = mongo.db["PATIENTS"].find({"reviewed": False, "locked": False},
+                                         {"_id": 0, "patient_id": 1}).sort([('index_no', 1)])
+
     # check is this patient has any unreviewed annotations
-    for patient_id in get_patient_ids():
-        annotations = get_patient_annotation_ids(patient_id)
-        if len(annotations) > 0:
+    for patient in patients:
+        patient_id = patient["patient_id"]
+        annotation = mongo.db["ANNOTATIONS"].find_one({"patient_id": patient_id,
+                                                       "isNegated": False,
+                                                       "reviewed": ReviewStatus.UNREVIEWED.value},
+                                                      {"_id": 1})
+        if annotation is not None:
             return patient_id
 
     return None
@@ -802,8 +948,9 @@ def get_documents_to_annotate(patient_id=None):
     Returns: All matching notes from the database.
     """
     logger.debug("Retriving all annotated documents from database.")
+    # Filter the notes before the join so only candidate notes are
+    # looked up in ANNOTATIONS.
     match_stage = {
-        "annotations": {"$eq": []},
         "reviewed": {"$ne": True}
     }
     if patient_id:
@@ -811,6 +958,8 @@ def get_documents_to_annotate(patient_id=None):
 
     documents_to_annotate = mongo.db["NOTES"].aggregate(
         [{
+            "$match": match_stage
+        }, {
             "$lookup": {
                 "from": "ANNOTATIONS",
                 "localField": "text_id",
@@ -818,23 +967,26 @@ def get_documents_to_annotate(patient_id=None):
                 "as": "annotations"
             }
         }, {
-            "$match": match_stage
+            "$match": {"annotations": {"$eq": []}}
+        }, {
+            "$project": {"annotations": 0}
         }])
 
     return documents_to_annotate
 
 
-def get_all_annotations_for_patient(patient_id: str):
+def get_all_annotations_for_patient(patient_id: str, projection=None):
     """
     Retrives all annotations for a patient.
 
     Args:
         patient_id (str) : Unique ID for a patient.
+        projection (dict) : Optional projection to only fetch some fields.
     Returns:
         annotations (list) : A list of all annotations for that patient.
     """
     annotations = list(mongo.db["ANNOTATIONS"]
-                       .find({"patient_id": patient_id, "isNegated": False})
+                       .find({"patient_id": patient_id, "isNegated": False}, projection)
                        .sort([("text_date", 1), ("note_id", 1), ("note_start_index", 1)]))
 
     return annotations
@@ -900,11 +1052,17 @@ def get_patient_annotation_ids(p_id: str, reviewed=ReviewStatus.UNREVIEWED, key=
     logger.debug(f"Retriving annotations for patient #{p_id} from database.")
     query_filter = {"patient_id": p_id, "isNegated": False, "reviewed": reviewed.value}
 
+    # Only transfer the fields used to build the result
+    if key == "sentence":
+        projection = {"_id": 0, "note_id": 1, "text_date": 1, "sentence": 1}
+    else:
+        projection = {key: 1}
+
     annotation_ids = mongo.db["ANNOTATIONS"].find(
-        query_filter).sort([
+        query_filter, projection).sort([
             ("note_id", 1),
             ('text_date', 1),
-            ("sentence_number", 1)])
+            ("sentence_number", 1)]).batch_size(1000)
 
     res = []
     if key == "sentence":
@@ -942,7 +1100,8 @@ def get_event_date(patient_id: str):
     Find the event date for a patient.
     """
     logger.debug(f"Retriving event date for patient #{patient_id}.")
-    patient = mongo.db["PATIENTS"].find_one({"patient_id": patient_id})
+    patient = mongo.db["PATIENTS"].find_one({"patient_id": patient_id},
+                                            {"_id": 0, "event_date": 1})
 
     if patient and patient['event_date'] is not None:
         #date_format = '%Y-%m-%d'
@@ -961,14 +1120,11 @@ def get_event_date_sentences(patient_id: str):
     if event_date is None:
         return []
     annotations = mongo.db["ANNOTATIONS"].find({
-        "patient_id": patient_id}).sort(
+        "patient_id": patient_id},
+        {"_id": 0, "note_id": 1, "sentence": 1}).sort(
                 [("text_date", 1)]
                 )
-    annotations = list(annotations)
-    res = []
-    if len(annotations) > 0:
-        res = [f'{annotation["note_id"]}: {annotation["sentence"]}' for annotation in annotations]
-    return res
+    return [f'{annotation["note_id"]}: {annotation["sentence"]}' for annotation in annotations]
 
 
 def get_note_date(note_id):
@@ -981,7 +1137,8 @@ def get_note_date(note_id):
         note_date (datetime) : The date of the note.
     """
     logger.debug(f"Retriving date for note #{note_id}.")
-    note = mongo.db["NOTES"].find_one({"text_id": note_id})
+    note = mongo.db["NOTES"].find_one({"text_id": note_id},
+                                      {"_id": 0, "text_date": 1})
     return note["text_date"]
 
 
@@ -1048,18 +1205,20 @@ def get_last_note_date_for_patient(patient_id: str, last_note_date=None):
     return summary["last_note_date"]
 
 
-def get_all_annotations():
+def get_all_annotations(projection=None, batch_size=500):
     """
-    Returns a list of all annotations from the database.
+    Returns a cursor over all annotations in the database.
+    Callers that need a list should wrap the result in list().
 
     Args:
-        None
+        projection (dict) : Fields to return for each annotation, all fields if None.
+        batch_size (int) : Number of annotations fetched per round trip.
     Returns:
-        Annotations (list) : This is a list of all annotations from the database.
+        Annotations (pymongo.cursor.Cursor) : A cursor over all annotations in the database.
     """
-    annotations = mongo.db["ANNOTATIONS"].find()
+    annotations = mongo.db["ANNOTATIONS"].find({}, projection=projection)
 
-    return list(annotations)
+    return annotations.batch_size(batch_size)
 
 
 def get_proj_name():
@@ -1072,7 +1231,7 @@ def get_proj_name():
         proj_name (str) : The name of the current CEDARS project.
     """
 
-    proj_info = mongo.db["INFO"].find_one()
+    proj_info = _get_cached_info()
     if proj_info is None:
         return None
     proj_name = proj_info["project"]
@@ -1089,7 +1248,7 @@ def get_curr_version():
         proj_name (str) : The name of the current CEDARS project.
     """
 
-    proj_info = mongo.db["INFO"].find_one()
+    proj_info = _get_cached_info()
 
     return proj_info["CEDARS_version"]
 
@@ -1104,7 +1263,7 @@ def get_project_users():
         usernames (list) : List of all usernames for approved users
                            (including the admin) for this project
     """
-    users = mongo.db["USERS"].find({})
+    users = mongo.db["USERS"].find({}, {"_id": 0, "user": 1})
 
     return [user["user"] for user in users]
 
@@ -1125,7 +1284,7 @@ def get_all_patient_ids():
     # Mongodb will ignore this command if index_no does not exist.
     # This is improtant for backwards compatibility,
     # as the index_no will not be present in older CEDARS versions.
-    patients = mongo.db["PATIENTS"].find({}, {'patient_id' : 1}).sort([('index_no', 1)])
+    patients = mongo.db["PATIENTS"].find({}, {"_id": 0, "patient_id": 1}).sort([('index_no', 1)])
 
     return [patient["patient_id"] for patient in patients]
 
@@ -1145,7 +1304,8 @@ def get_patient_ids():
     # Mongodb will ignore this command if index_no does not exist.
     # This is improtant for backwards compatibility,
     # as the index_no will not be present in older CEDARS versions.
-    patients = mongo.db["PATIENTS"].find({"reviewed": False, "locked": False}).sort([('index_no', 1)])
+    patients = mongo.db["PATIENTS"].find({"reviewed": False, "locked": False},
+                                         {"_id": 0, "patient_id": 1}).sort([('index_no', 1)])
 
     res = [patient["patient_id"] for patient in patients]
     logger.info(f"Retrived {len(res)} patient IDs from the database.")
@@ -1165,7 +1325,8 @@ def get_patient_lock_status(patient_id: str):
     Raises:
         None
     """
-    patient = mongo.db["PATIENTS"].find_one({"patient_id": patient_id})
+    patient = mongo.db["PATIENTS"].find_one({"patient_id": patient_id},
+                                            {"_id": 0, "locked": 1})
     return patient["locked"]
 
 
@@ -1194,17 +1355,24 @@ def get_num_patient_notes(patient_id: str, num_notes=None):
     return summary["num_notes"] if summary else 0
 
 
-def get_patient_notes(patient_id: str, reviewed=False):
+def get_patient_notes(patient_id: str, reviewed=False, projection=None, limit=None):
     """
-    Returns all notes for that patient.
+    Returns all notes for that patient, oldest first.
 
     Args:
         patient_id (str) : ID for the patient
+        reviewed (bool) : Review status of the notes to return.
+        projection (dict) : Fields to return for each note, all fields if None.
+        limit (int) : Maximum number of notes to return, all notes if None.
     Returns:
-        notes: A list of all notes for that patient
+        notes (pymongo.cursor.Cursor) : A cursor over the notes for that patient.
     """
     mongodb_search_query = {"patient_id": patient_id, "reviewed": reviewed}
-    notes = mongo.db["NOTES"].find(mongodb_search_query)
+    notes = (mongo.db["NOTES"].find(mongodb_search_query, projection=projection)
+             .sort([("text_date", 1)])
+             .batch_size(200))
+    if limit is not None:
+        notes = notes.limit(limit)
     return notes
 
 
@@ -1234,14 +1402,15 @@ def get_annotated_notes_for_patient(patient_id: str) -> list[str]:
         notes (list[str]) : List of note_ids for the patient which have
             matching keyword annotations
     """
-    annotations = (mongo.db["ANNOTATIONS"]
-                   .find({"patient_id": patient_id})
-                   .sort([("text_date", 1), ("note_id", 1), ("note_start_index", 1)]))
-    notes = []
-    for annotation in annotations:
-        notes.append(annotation["note_id"])
+    # All annotations of a note share its text_date, so grouping by note
+    # and sorting on (text_date, note_id) keeps the original note order.
+    notes = mongo.db["ANNOTATIONS"].aggregate([
+        {"$match": {"patient_id": patient_id}},
+        {"$group": {"_id": "$note_id", "text_date": {"$min": "$text_date"}}},
+        {"$sort": {"text_date": 1, "_id": 1}}
+    ])
 
-    return list(dict.fromkeys(notes))
+    return [note["_id"] for note in notes]
 
 
 # update functions
@@ -1256,6 +1425,7 @@ def update_project_name(new_name):
     """
     logger.info(f"Updating project name to #{new_name}")
     mongo.db["INFO"].update_one({}, {"$set": {"project": new_name}})
+    clear_info_cache()
 
 def update_pines_api_status(new_status):
     """
@@ -1270,6 +1440,7 @@ def update_pines_api_status(new_status):
     logger.info(f"Setting PINES API status to {new_status}")
     mongo.db["INFO"].update_one({},
                                 {"$set": {"is_pines_server_enabled": new_status}})
+    clear_info_cache()
 
 def update_pines_api_url(new_url):
     """
@@ -1284,6 +1455,7 @@ def update_pines_api_url(new_url):
     logger.info(f"Setting PINES API url to {new_url}")
     mongo.db["INFO"].update_one({},
                                 {"$set": {"pines_url": new_url}})
+    clear_info_cache()
 
 
 
@@ -1301,10 +1473,10 @@ def mark_annotation_reviewed(annotation_id, reviewed_by):
         None
     """
     logger.debug(f"Marking annotation #{annotation_id} as reviewed.")
-    mongo.db["ANNOTATIONS"].update_one({"_id": ObjectId(annotation_id)},
-                                       {"$set": {"reviewed": ReviewStatus.REVIEWED.value}})
-
-    annotation_data = get_annotation(annotation_id)
+    annotation_data = mongo.db["ANNOTATIONS"].find_one_and_update(
+        {"_id": ObjectId(annotation_id)},
+        {"$set": {"reviewed": ReviewStatus.REVIEWED.value}},
+        projection={"_id": 0, "note_id": 1})
     note_id = annotation_data['note_id']
 
     # Get the number of unreviewed annotations for the note this annotation belongs to
@@ -1315,6 +1487,37 @@ def mark_annotation_reviewed(annotation_id, reviewed_by):
         mark_note_reviewed(note_id, reviewed_by)
 
 
+def mark_annotations_reviewed(annotation_ids, reviewed_by):
+    """
+    Marks several annotations as reviewed at once.
+    Notes left without unreviewed annotations are marked as reviewed as well.
+
+    Args:
+        - annotation_ids (list[str]) : Unique IDs of the annotations.
+        - reviewed_by (str) : The name of the user who reviewed these annotations.
+
+    Returns:
+        None
+    """
+    if len(annotation_ids) == 0:
+        return
+
+    logger.debug(f"Marking {len(annotation_ids)} annotations as reviewed.")
+    object_ids = [ObjectId(annotation_id) for annotation_id in annotation_ids]
+    mongo.db["ANNOTATIONS"].update_many({"_id": {"$in": object_ids}},
+                                        {"$set": {"reviewed": ReviewStatus.REVIEWED.value}})
+
+    note_ids = mongo.db["ANNOTATIONS"].distinct("note_id", {"_id": {"$in": object_ids}})
+    pending_note_ids = mongo.db["ANNOTATIONS"].distinct("note_id",
+                                                        {"note_id": {"$in": note_ids},
+                                                         "reviewed": ReviewStatus.UNREVIEWED.value})
+    reviewed_note_ids = list(set(note_ids) - set(pending_note_ids))
+    if len(reviewed_note_ids) > 0:
+        mongo.db["NOTES"].update_many({"text_id": {"$in": reviewed_note_ids}},
+                                      {"$set": {"reviewed": True,
+                                                "reviewed_by": reviewed_by}})
+
+
 def revert_annotation_reviewed(annotation_id, reviewed_by):
     '''
     Reverts a reviewed annotation to be marked unreviewed in the case
@@ -1328,10 +1531,10 @@ def revert_annotation_reviewed(annotation_id, reviewed_by):
         None
     '''
     logger.debug(f"Marking annotation #{annotation_id} as un-reviewed.")
-    mongo.db["ANNOTATIONS"].update_one({"_id": ObjectId(annotation_id)},
-                                       {"$set": {"reviewed": ReviewStatus.UNREVIEWED.value}})
-
-    annotation_data = get_annotation(annotation_id)
+    annotation_data = mongo.db["ANNOTATIONS"].find_one_and_update(
+        {"_id": ObjectId(annotation_id)},
+        {"$set": {"reviewed": ReviewStatus.UNREVIEWED.value}},
+        projection={"_id": 0, "note_id": 1})
     note_id = annotation_data['note_id']
 
     # Mark the note this annotation belongs to as un-reviewed
@@ -1430,6 +1633,25 @@ def delete_event_date(patient_id: str):
     delete_event_annotation_id(patient_id)
 
 
+def get_patient_event(patient_id: str):
+    """
+    Retrives the event date and the ID of the annotation where it was found
+            for a patient in a single query.
+
+    Args:
+        patient_id (str) : Unique ID for the patient.
+    Returns:
+        (event_date, event_annotation_id) : Both are None if no event was entered.
+    """
+    patient = mongo.db["PATIENTS"].find_one({"patient_id": patient_id},
+                                            {"_id": 0, "event_date": 1,
+                                             "event_annotation_id": 1})
+    if patient is None:
+        return None, None
+
+    return patient.get("event_date"), patient.get("event_annotation_id")
+
+
 def get_event_annotation_id(patient_id: str):
     """
     Retrives the ID for the annotation where 
@@ -1442,7 +1664,8 @@ def get_event_annotation_id(patient_id: str):
     """
     logger.debug(f"Retriving event_annotation_id for patient #{patient_id}.")
 
-    patient = mongo.db["PATIENTS"].find_one({"patient_id": patient_id})
+    patient = mongo.db["PATIENTS"].find_one({"patient_id": patient_id},
+                                            {"_id": 0, "event_annotation_id": 1})
 
     if patient is not None:
         return patient["event_annotation_id"]
@@ -1520,23 +1743,27 @@ def reset_patient_reviewed():
     """
     Update all patients, notes to be un-reviewed.
     """
-    mongo.db["PATIENTS"].update_many({},
-                                     {"$set": {"reviewed": False,
-                                               "reviewed_by": "",
-                                               "event_annotation_id": None,
-                                               "event_date": None,
-                                               "comments": ""}})
-    mongo.db["NOTES"].update_many({}, {"$set": {"reviewed": False,
-                                                "reviewed_by": ""}})
+    patients = mongo.db["PATIENTS"].with_options(write_concern=_PRIMARY_ACK)
+    notes = mongo.db["NOTES"].with_options(write_concern=_PRIMARY_ACK)
+    patients.update_many({},
+                         {"$set": {"reviewed": False,
+                                   "reviewed_by": "",
+                                   "event_annotation_id": None,
+                                   "event_date": None,
+                                   "comments": ""}})
+    notes.update_many({}, {"$set": {"reviewed": False,
+                                    "reviewed_by": ""}})
 
 
-def add_comment(annotation_id, comment):
+def add_comment(annotation_id, comment, patient_id=None):
     """
     Stores a new comment for a patient.
 
     Args:
         annotation_id (str) : Unique ID for the annotation.
         comment (str) : Text of the comment on this annotation.
+        patient_id (str) : ID of the patient the annotation belongs to.
+            Looked up from the annotation if not given.
     Returns:
         None
     """
@@ -1545,8 +1772,10 @@ def add_comment(annotation_id, comment):
         logger.debug(f"Comment deleted on annotation # {annotation_id}.")
     else:
         logger.info(f"Adding comment to annotation #{annotation_id}")
-    patient_id = mongo.db["ANNOTATIONS"].find_one(
-        {"_id": ObjectId(annotation_id)})["patient_id"]
+    if patient_id is None:
+        patient_id = mongo.db["ANNOTATIONS"].find_one(
+            {"_id": ObjectId(annotation_id)},
+            {"_id": 0, "patient_id": 1})["patient_id"]
 
     mongo.db["PATIENTS"].update_one({"patient_id": patient_id},
                                     {"$set":
@@ -1575,8 +1804,9 @@ def remove_all_locked():
     Sets the locked status of all patients to False.
     This is done when the server is shutting down.
     """
-    patients_collection = mongo.db["PATIENTS"]
-    patients_collection.update_many({},
+    patients_collection = mongo.db["PATIENTS"].with_options(write_concern=_PRIMARY_ACK)
+    # Only touch locked patients; on a clean shutdown there are usually none.
+    patients_collection.update_many({"locked": True},
                                     {"$set": {"locked": False}})
 
 
@@ -1602,17 +1832,21 @@ def empty_annotations():
     """
 
     logger.info("Deleting all data in annotations collection.")
-    annotations = mongo.db["ANNOTATIONS"]
-    annotations.delete_many({})
+    # Dropping and re-indexing the collection is a metadata operation,
+    # unlike delete_many({}) which removes documents one at a time.
+    mongo.db["ANNOTATIONS"].drop()
+    create_collection_indices("ANNOTATIONS")
 
     # also reset the queue
     flask.current_app.task_queue.empty()
-    mongo.db["TASK"].delete_many({})
+    mongo.db["TASK"].drop()
+    create_collection_indices("TASK")
 
 
 def drop_database(name):
     """Clean Database"""
     mongo.cx.drop_database(name)
+    clear_info_cache()
 
 
 # utility functions
@@ -1628,14 +1862,16 @@ def check_password(username, password):
         (bool) : True if the password matches the password of that user from the database.
     """
 
-    user = mongo.db["USERS"].find_one({"user": username})
+    user = mongo.db["USERS"].find_one({"user": username},
+                                      {"_id": 0, "password": 1})
 
     return "password" in user and check_password_hash(user["password"], password)
 
 
 def is_admin_user(username):
     """check if the user is admin"""
-    user = mongo.db["USERS"].find_one({'user': username})
+    user = mongo.db["USERS"].find_one({'user': username},
+                                      {"_id": 0, "is_admin": 1})
 
     if user is not None and user["is_admin"]:
         return True
@@ -1650,27 +1886,31 @@ def get_curr_stats():
 
     """
     stats = {}
-    # Aggregation pipeline to count unique patients
-    pipeline_unique_patients = [
-        {"$group": {"_id": "$patient_id"}}
-    ]
-    unique_patients = list(mongo.db.PATIENTS.aggregate(pipeline_unique_patients))
-    stats["number_of_patients"] = len(unique_patients)
+    # patient_id is unique in PATIENTS, so the collection metadata count
+    # is the number of patients.
+    stats["number_of_patients"] = mongo.db.PATIENTS.estimated_document_count()
 
-    pipeline_annotated_patients = [
+    # Single pass over the non-negated annotations for the annotated patient count,
+    # the total number of tokens and the lemma distribution.
+    pipeline_annotations = [
         {"$match": {"isNegated": False}},
-        {"$group": {"_id": "$patient_id"}}
+        {"$facet": {
+            "annotated_patients": [
+                {"$group": {"_id": "$patient_id"}},
+                {"$count": "count"}
+            ],
+            "total_tokens": [{"$count": "count"}],
+            "lemma_dist": [
+                {"$group": {"_id": "$token", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": 10},
+                {"$project": {"token": "$_id", "_id": 0, "count": 1}}
+            ]
+        }}
     ]
-    annotated_patients = list(mongo.db.ANNOTATIONS.aggregate(pipeline_annotated_patients))
-    stats["number_of_annotated_patients"] = len(annotated_patients)
-
-    # Aggregation pipeline to count reviewed annotations
-    pipeline_reviewed = [
-        {"$match": {"reviewed": True}},
-        {"$group": {"_id": "$patient_id"}}
-    ]
-    reviewed_annotations = list(mongo.db.PATIENTS.aggregate(pipeline_reviewed))
-    stats["number_of_reviewed"] = len(reviewed_annotations)
+    annotation_stats = list(mongo.db.ANNOTATIONS.aggregate(pipeline_annotations))[0]
+    annotated_patients = annotation_stats["annotated_patients"]
+    stats["number_of_annotated_patients"] = annotated_patients[0]["count"] if annotated_patients else 0
 
     # pipeline for notes and reviewed by user for notes with reviewed_by field
     pipeline_patients = [
@@ -1680,36 +1920,35 @@ def get_curr_stats():
 
     reviewed_notes = list(mongo.db.PATIENTS.aggregate(pipeline_patients))
     stats["user_review_stats"] = {doc["_id"]: doc["count"] for doc in reviewed_notes}
-    # Aggregation pipeline for lemma distribution
-    pipeline_lemma_dist = [
-        {"$match": {"isNegated": False}},
-        {"$group": {"_id": "$token", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 10},
-        {"$project": {"token": "$_id", "_id": 0, "count": 1}}
-    ]
-    lemma_dist_results = mongo.db.ANNOTATIONS.aggregate(pipeline_lemma_dist)
-    total_tokens = mongo.db.ANNOTATIONS.count_documents({"isNegated": False})
-    stats['lemma_dist'] = {doc['token']: 100 * doc['count']/total_tokens for doc in lemma_dist_results}
+    # Every reviewed patient falls in exactly one reviewer group
+    stats["number_of_reviewed"] = sum(doc["count"] for doc in reviewed_notes)
+
+    total_tokens = annotation_stats["total_tokens"]
+    total_tokens = total_tokens[0]["count"] if total_tokens else 0
+    stats['lemma_dist'] = {doc['token']: 100 * doc['count']/total_tokens
+                           for doc in annotation_stats["lemma_dist"]}
 
     return stats
 
 
 # pines functions
-def get_prediction(note: str) -> float:
+def get_prediction(note: str, pines_api_url: Optional[str] = None) -> float:
     """
     ##### PINES predictions
 
     Get prediction from endpoint. Text goes in the POST request.
+    Pass `pines_api_url` when calling outside of the application context
+    (e.g. from a worker thread).
     """
 
-    pines_api_url = get_pines_url()
+    if pines_api_url is None:
+        pines_api_url = get_pines_url()
 
     url = f'{pines_api_url}/predict'
     data = {'text': note}
     log_notes = None
     try:
-        response = requests.post(url, json=data, timeout=3600)
+        response = _pines_session.post(url, json=data, timeout=3600)
         response.raise_for_status()
         res = response.json()["prediction"]
         score = res.get("score")
@@ -1718,7 +1957,7 @@ def get_prediction(note: str) -> float:
             score = 1 - score if "0" in label else score
         else:
             score = 1 - score if label == 0 else score
-        log_notes = re.sub(r'\d', '*', note[:20])
+        log_notes = _DIGITS.sub('*', note[:20])
         logger.debug(f"Got prediction for note: {log_notes} with score: {score} and label: {label}")
         return score
     except requests.exceptions.RequestException as e:
@@ -1810,7 +2049,7 @@ def get_note_prediction_from_db(note_id: str,
     pines_collection = mongo.db[pines_collection_name]
     query = {"text_id": note_id}
 
-    pines_pred = pines_collection.find_one(query)
+    pines_pred = pines_collection.find_one(query, {"_id": 0, "predicted_score": 1})
     if pines_pred:
         logger.debug(f"Found prediction in db for : {note_id}: {pines_pred.get('predicted_score')}")
         return round(pines_pred.get("predicted_score"), 2)
@@ -1818,14 +2057,150 @@ def get_note_prediction_from_db(note_id: str,
     return None
 
 
+def get_note_predictions_from_db(note_ids: list[str],
+                                 pines_collection_name: str = "PINES") -> dict[str, float]:
+    """
+    Retrieve the prediction scores for several notes in one query
+
+    Args:
+        note_ids (list[str]): The note_ids for which we want to retrieve the predictions
+        pines_collection_name (str): The name of the collection in the database
+
+    Returns:
+        dict[str, float]: The prediction score for each note found in the database
+    """
+    pines_collection = mongo.db[pines_collection_name]
+    query = {"text_id": {"$in": note_ids}}
+
+    pines_preds = pines_collection.find(query, {"_id": 0, "text_id": 1, "predicted_score": 1})
+    return {pred["text_id"]: round(pred["predicted_score"], 2) for pred in pines_preds}
+
+
+def hash_note_text(text: str) -> str:
+    """
+    Returns the SHA-256 hex digest of a note's whitespace-normalized text,
+    used to find earlier predictions for notes with identical text.
+    """
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def get_note_predictions_by_hash(text_hashes: list[str],
+                                 pines_collection_name: str = "PINES") -> dict[str, float]:
+    """
+    Retrieve stored prediction scores for several note texts in one query.
+
+    Args:
+        text_hashes (list[str]): Hashes of note texts from hash_note_text
+        pines_collection_name (str): The name of the collection in the database
+
+    Returns:
+        dict[str, float]: The stored prediction score for each hash found in the database
+    """
+    pines_preds = mongo.db[pines_collection_name].find({"text_hash": {"$in": text_hashes}},
+                                                       {"_id": 0, "text_hash": 1,
+                                                        "predicted_score": 1})
+    return {pred["text_hash"]: round(pred["predicted_score"], 2) for pred in pines_preds}
+
+
+def round_pines_scores(pines_collection_name: str = "PINES") -> int:
+    """
+    Rounds prediction scores stored before predictions were rounded on save,
+    so exports show the same precision for every note.
+
+    Args:
+        pines_collection_name (str): The name of the collection in the database
+
+    Returns:
+        int: The number of predictions that were updated
+    """
+    pines_collection = mongo.db[pines_collection_name]
+    pines_preds = pines_collection.find({"predicted_score": {"$type": "double"}},
+                                        {"predicted_score": 1}, batch_size=PINES_BATCH_SIZE)
+    updated = 0
+    for preds in _chunked(pines_preds, PINES_BATCH_SIZE):
+        updates = [UpdateOne({"_id": pred["_id"]},
+                             {"$set": {"predicted_score": round(pred["predicted_score"], 2)}})
+                   for pred in preds
+                   if round(pred["predicted_score"], 2) != pred["predicted_score"]]
+        if len(updates) > 0:
+            pines_collection.bulk_write(updates, ordered=False)
+            updated += len(updates)
+
+    logger.info(f"Rounded {updated} stored PINES predictions.")
+    return updated
+
+
+def _chunked(iterable, size: int):
+    """Yield lists of at most `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _predict_notes(notes: list[dict],
+                   executor: ThreadPoolExecutor,
+                   pines_api_url: str,
+                   known_scores: dict[str, float],
+                   pines_collection_name: str = "PINES",
+                   force_update: bool = False) -> list[dict]:
+    """
+    Build the PINES documents for a chunk of notes.
+
+    `known_scores` maps text hashes to the scores seen so far in this run and
+    is updated in place. Each distinct text without a score is sent to the
+    PINES server once, concurrently through `executor`.
+    """
+    text_hashes = [hash_note_text(note.get("text")) for note in notes]
+    if not force_update:
+        unseen_hashes = list({text_hash for text_hash in text_hashes
+                              if text_hash not in known_scores})
+        if len(unseen_hashes) > 0:
+            known_scores.update(get_note_predictions_by_hash(unseen_hashes,
+                                                             pines_collection_name))
+
+    texts = {}
+    for note, text_hash in zip(notes, text_hashes):
+        if text_hash in known_scores:
+            logger.info(f"Reusing prediction for note with identical text: {note.get('text_id')}")
+        else:
+            logger.info(f"Predicting for note: {note.get('text_id')}")
+            texts.setdefault(text_hash, note.get("text"))
+
+    scores = executor.map(partial(get_prediction, pines_api_url=pines_api_url), texts.values())
+    for text_hash, score in zip(texts, scores):
+        # Scores are stored with the precision used for the review threshold.
+        known_scores[text_hash] = round(score, 2)
+
+    return [{
+        "text_id": note.get("text_id"),
+        "text_hash": text_hash,
+        "text_date" : note.get("text_date"),
+        "patient_id": note.get("patient_id"),
+        "predicted_score": known_scores[text_hash],
+        "report_type": note.get("text_tag_3"),
+        "document_type": note.get("text_tag_1")
+        } for note, text_hash in zip(notes, text_hashes)]
+
+
+def _save_predictions(pines_collection, predictions: list[dict]) -> None:
+    """Upsert PINES documents by text_id so re-predicted notes replace their old score."""
+    pines_collection.bulk_write([UpdateOne({"text_id": prediction["text_id"]},
+                                           {"$set": prediction},
+                                           upsert=True)
+                                 for prediction in predictions],
+                                ordered=False)
+
+
 def predict_and_save(text_ids: Optional[list[str]] = None,
                      note_collection_name: str = "NOTES",
                      pines_collection_name: str = "PINES",
-                     force_update: bool = False) -> None:
+                     force_update: bool = False,
+                     max_workers: int = PINES_MAX_WORKERS) -> None:
     """
     ##### Save PINES predictions
 
     Predict and save the predictions for the given text_ids.
+    Up to `max_workers` notes are sent to the PINES server at a time.
     """
     notes_collection = mongo.db[note_collection_name]
     pines_collection = mongo.db[pines_collection_name]
@@ -1833,23 +2208,58 @@ def predict_and_save(text_ids: Optional[list[str]] = None,
     if text_ids is not None:
         query = {"text_id": {"$in": text_ids}}
 
-    cedars_notes = notes_collection.find(query)
-    count = 0
-    for note in cedars_notes:
-        note_id = note.get("text_id")
-        if force_update or get_note_prediction_from_db(note_id, pines_collection_name) is None:
-            logger.info(f"Predicting for note: {note_id}")
-            prediction = get_prediction(note.get("text"))
-            pines_collection.insert_one({
-                "text_id": note_id,
-                "text": note.get("text"),
-                "text_date" : note.get("text_date"),
-                "patient_id": note.get("patient_id"),
-                "predicted_score": prediction,
-                "report_type": note.get("text_tag_3"),
-                "document_type": note.get("text_tag_1")
-                })
-        count += 1
+    # Predictions run in worker threads without an application context, so the
+    # url must be known before any work is submitted.
+    pines_api_url = get_pines_url()
+    if not pines_api_url:
+        raise ValueError("No PINES url is set in the INFO collection, cannot get predictions.")
+
+    # Only the fields needed to predict and build the PINES documents
+    projection = {"_id": 0, "text_id": 1, "text": 1, "text_date": 1, "patient_id": 1,
+                  "text_tag_1": 1, "text_tag_3": 1}
+
+    if force_update:
+        # Predictions can take a while, so the cursor must not time out between batches.
+        cursor = notes_collection.find(query, projection, batch_size=1000,
+                                       no_cursor_timeout=True)
+        note_chunks = _chunked(cursor, PINES_CHUNK_SIZE)
+    else:
+        # Find the notes that don't have a prediction yet so only those are read.
+        cursor = notes_collection.aggregate([
+            {"$match": query},
+            {"$project": {"_id": 0, "text_id": 1}},
+            {"$lookup": {
+                "from": pines_collection_name,
+                "localField": "text_id",
+                "foreignField": "text_id",
+                "as": "pines"
+            }},
+            {"$match": {"pines": {"$size": 0}}},
+            {"$project": {"text_id": 1}}
+        ])
+        # Predictions can take minutes per chunk and an aggregation cursor cannot
+        # disable its idle timeout, so read the (small) ids up front. The notes
+        # are then read one chunk of ids at a time so no single query is too large.
+        unpredicted_ids = [note["text_id"] for note in cursor]
+        note_chunks = (list(notes_collection.find({"text_id": {"$in": chunk}}, projection))
+                       for chunk in _chunked(unpredicted_ids, PINES_CHUNK_SIZE))
+
+    predictions = []
+    known_scores = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for notes in note_chunks:
+                predictions.extend(_predict_notes(notes, executor, pines_api_url,
+                                                  known_scores, pines_collection_name,
+                                                  force_update))
+                if len(predictions) >= PINES_BATCH_SIZE:
+                    _save_predictions(pines_collection, predictions)
+                    predictions = []
+    finally:
+        cursor.close()
+
+    if len(predictions) > 0:
+        _save_predictions(pines_collection, predictions)
 
 
 def add_task(task):
@@ -1869,6 +2279,19 @@ def get_tasks_in_progress():
     return task_db.find({"complete": False})
 
 
+def count_tasks_in_progress(limit: Optional[int] = None) -> int:
+    """
+    Counts the tasks that have not been completed yet on the server.
+
+    Args:
+        limit (int) : Stop counting after this many tasks, all of them are counted if None.
+            Use limit=1 to only check whether any task is still running.
+    """
+    if limit is None:
+        return mongo.db["TASK"].count_documents({"complete": False})
+    return mongo.db["TASK"].count_documents({"complete": False}, limit=limit)
+
+
 def get_task_in_progress(task_id):
     """
     Returns the task with this ID, if it has not been completed.
@@ -1937,7 +2360,8 @@ def get_patient_reviewer(patient_id: str):
     Updates the note's status to reviewed in the database.
     """
 
-    reviewed_by = mongo.db["PATIENTS"].find_one({"patient_id": patient_id})["reviewed_by"]
+    reviewed_by = mongo.db["PATIENTS"].find_one({"patient_id": patient_id},
+                                                {"_id": 0, "reviewed_by": 1})["reviewed_by"]
     if reviewed_by.strip() == "":
         return None
 
@@ -1948,9 +2372,9 @@ def get_pines_url():
     Retrives PINES url from INFO col.
     '''
 
-    info_col = mongo.db["INFO"].find_one()
+    info_col = mongo.db["INFO"].find_one({}, {"_id": 0, "pines_url": 1})
     if info_col:
-        return info_col["pines_url"]
+        return info_col.get("pines_url")
 
     return None
 
@@ -1959,7 +2383,7 @@ def is_pines_api_running():
     Returns True if a SuperBIO PINES API server is running.
     '''
 
-    info_col = mongo.db["INFO"].find_one()
+    info_col = mongo.db["INFO"].find_one({}, {"_id": 0, "is_pines_server_enabled": 1})
     if info_col:
         return info_col["is_pines_server_enabled"]
 
@@ -2057,10 +2481,15 @@ def update_patient_results(update_existing_results = False):
 
     if "RESULTS" not in mongo.db.list_collection_names():
         # Create results collection
-        populate_results()
+        create_collection_indices("RESULTS")
+
+    # One query for all stored results instead of a find_one per patient
+    patients_with_results = set()
+    if not update_existing_results:
+        patients_with_results = set(mongo.db["RESULTS"].distinct("patient_id"))
 
     for patient_id in get_all_patient_ids():
-        if update_existing_results or (not patient_results_exist(patient_id)):
+        if patient_id not in patients_with_results:
             upsert_patient_records(patient_id)
 
 def terminate_project():
@@ -2070,19 +2499,19 @@ def terminate_project():
     Reset the database to the initial state.
     """
     logger.info("Terminating project.")
-    # Delete all mongo DB collections
-    mongo.db.drop_collection("ANNOTATIONS")
-    mongo.db.drop_collection("NOTES")
-    mongo.db.drop_collection("PATIENTS")
-    mongo.db.drop_collection("USERS")
-    mongo.db.drop_collection("QUERY")
-    mongo.db.drop_collection("PINES")
-    mongo.db.drop_collection("TASK")
-    mongo.db.drop_collection("RESULTS")
-    mongo.db.drop_collection("NOTES_SUMMARY")
+    # Delete all mongo DB collections except INFO, which keeps the project id.
+    # Only collections that exist are dropped to save a round trip for each
+    # one that was never created.
+    project_collections = ["ANNOTATIONS", "NOTES", "PATIENTS", "USERS", "QUERY",
+                           "PINES", "TASK", "RESULTS", "NOTES_SUMMARY"]
+    existing_collections = set(mongo.db.list_collection_names())
+    for collection in project_collections:
+        if collection in existing_collections:
+            mongo.db.drop_collection(collection)
 
     project_id = os.getenv("PROJECT_ID", None)
 
+    fake = get_fake()
     create_project(project_name=fake.slug(),
                    investigator_name=fake.name(),
                    project_id = project_id)
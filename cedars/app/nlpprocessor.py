@@ -189,10 +189,12 @@ class NlpProcessor:
         docs_with_annotations = 0
         for document, doc in zip(document_list, annotations):
             match_count = 0
-            sentence_start = 0
-            sentence_end = 0
             for sent_no, sentence_annotation in enumerate(doc.sents):
                 sentence_text = sentence_annotation.text.strip()
+                # Offsets of the stripped sentence in the note text
+                sentence_start = (sentence_annotation.start_char
+                                  + len(sentence_annotation.text)
+                                  - len(sentence_annotation.text.lstrip()))
                 sentence_end = sentence_start + len(sentence_text)
                 matches = self.matcher(sentence_annotation)
                 for match in matches:
@@ -221,8 +223,6 @@ class NlpProcessor:
                             docs_with_annotations += 1
                         match_count += 1
 
-                sentence_start = sentence_end + 1
-
             if match_count == 0:
                 db.mark_note_reviewed(document["text_id"], reviewed_by="CEDARS")
             count += 1
@@ -259,9 +259,10 @@ class NlpProcessor:
             return
 
         db.predict_and_save(notes)
+        predictions = db.get_note_predictions_from_db(notes)
         scores = []
         for note_id in notes:
-            score = db.get_note_prediction_from_db(note_id)
+            score = predictions.get(note_id)
             scores.append(score)
             if score < threshold:
                 updated_annots = db.update_annotation_reviewed(note_id)
@@ -308,4 +309,4 @@ class NlpProcessor:
             else:
                 logger.info(f"Task {task['job_id']} already completed")
 
-        logger.info(f"jobs in progress: {len(list(db.get_tasks_in_progress()))}")
+        logger.info(f"jobs in progress: {db.count_tasks_in_progress()}")
@@ -2,7 +2,9 @@
 This page contatins the functions and the flask blueprint for the /proj_details route.
 """
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from contextvars import copy_context
 from datetime import datetime, date
 import tempfile
 import pandas as pd
@@ -20,6 +22,7 @@ import requests
 from flask_login import current_user, login_required
 from werkzeug.utils import secure_filename
 from rq import Retry, Callback
+from rq.job import Job, JobStatus
 from rq.registry import FailedJobRegistry
 from rq.registry import FinishedJobRegistry, StartedJobRegistry
 from . import db
@@ -37,6 +40,16 @@ config = dotenv_values(".env")
 
 logger.enable(__name__)
 
+_ALLOWED_DATA_SUFFIXES = ('.csv', '.xlsx', '.json', '.parquet', '.pickle', '.pkl', '.xml', '.csv.gz')
+_ALLOWED_IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg')
+
+# Columns of an uploaded EMR file that are stored in the NOTES collection.
+NOTE_COLUMNS = ["patient_id", "text_id", "text", "text_date", "text_sequence", "doc_id",
+                "text_tag_1", "text_tag_2", "text_tag_3", "text_tag_4", "text_tag_5"]
+
+# Chunk size used to stream annotation downloads from minio.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 def allowed_data_file(filename):
     """
@@ -47,13 +60,7 @@ def allowed_data_file(filename):
     Returns:
         (bool) : True if the file is of a supported type.
     """
-    allowed_extensions = {'csv', 'xlsx', 'json', 'parquet', 'pickle', 'pkl', 'xml', 'csv.gz'}
-
-    for extension in allowed_extensions:
-        if filename.endswith('.' + extension):
-            return True
-
-    return False
+    return filename.lower().endswith(_ALLOWED_DATA_SUFFIXES)
 
 
 def allowed_image_file(filename):
@@ -65,11 +72,7 @@ def allowed_image_file(filename):
     Returns:
         (bool) : True if this is a supported image file type.
     """
-    allowed_extensions = {'png', 'jpg', 'jpeg'}
-
-    extension = filename.split(".")[-1]
-
-    return extension in allowed_extensions
+    return filename.lower().endswith(_ALLOWED_IMAGE_SUFFIXES)
 
 
 @bp.route("/project_details", methods=["GET", "POST"])
@@ -137,13 +140,48 @@ def read_gz_csv(filename, *args, **kwargs):
     return pd.read_csv(filename, compression='gzip', *args, **kwargs)
 
 
-def load_pandas_dataframe(filepath, chunk_size=1000):
+def prefetch(chunks):
+    """
+    Yield the items of `chunks` while the next one is read in a background thread.
+
+    The reader thread runs in a copy of the current context, so it can use the
+    app context (e.g. `g` and minio) of the caller.
+
+    Args:
+        chunks (iterable): Items to read ahead, e.g. DataFrames from load_pandas_dataframe.
+    Returns:
+        generator: The same items, in the same order.
+    """
+    iterator = iter(chunks)
+    context = copy_context()
+    done = object()
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(context.run, next, iterator, done)
+            while (chunk := future.result()) is not done:
+                future = executor.submit(context.run, next, iterator, done)
+                yield chunk
+    finally:
+        # Run the cleanup of a wrapped generator (e.g. temp files, minio responses)
+        # even if the consumer stops early or raises. The read ahead has finished
+        # once the executor is shut down, so the generator is not running.
+        if hasattr(iterator, "close"):
+            context.run(iterator.close)
+
+
+def load_pandas_dataframe(filepath, chunk_size=1000, columns=None, fileobj=None):
     """
     Load tabular data from a file into a pandas DataFrame.
 
     Args:
         filepath (str): The path to the file to load data from.
             Supported file extensions: csv, xlsx, json, parquet, pickle, pkl, xml.
+        chunk_size (int): Number of rows in each yielded DataFrame.
+        columns (list[str] | None): Only load these columns, if present in the file.
+            All columns are loaded when None.
+        fileobj (file-like | None): The contents of the file if they are already
+            available locally, e.g. a file that was just uploaded.
+            It is read instead of downloading the file from minio.
 
     Returns:
         pd.DataFrame: DataFrame with the data from the file.
@@ -175,23 +213,45 @@ def load_pandas_dataframe(filepath, chunk_size=1000):
                          Supported extensions are
                          {', '.join(loaders.keys())}.""")
 
+    obj = None
+    local_filename = None
     try:
         logger.info(filepath)
-        obj = minio.get_object(g.bucket_name, filepath)
-        local_directory = tempfile.gettempdir()
-        os.makedirs(local_directory, exist_ok=True)
-        local_filename = os.path.join(local_directory, os.path.basename(filepath))
-        minio.fget_object(g.bucket_name, filepath, local_filename)
-        logger.info(f"File downloaded successfully to {local_filename}")
-
-        # Re-initialise object from minio to load it again
+        if fileobj is not None:
+            source = fileobj
+        elif extension in ('csv', 'gz'):
+            # CSV files are parsed as they stream from minio instead of being saved to disk.
+            obj = source = minio.get_object(g.bucket_name, filepath)
+        else:
+            # CEDARS_TMP_DIR can point at a tmpfs mount if it is large enough for uploads
+            local_directory = os.getenv("CEDARS_TMP_DIR", tempfile.gettempdir())
+            os.makedirs(local_directory, exist_ok=True)
+            # A unique name keeps concurrent loads of the same file apart
+            file_descriptor, local_filename = tempfile.mkstemp(
+                suffix=f"_{os.path.basename(filepath)}", dir=local_directory)
+            os.close(file_descriptor)
+            minio.fget_object(g.bucket_name, filepath, local_filename)
+            logger.info(f"File downloaded successfully to {local_filename}")
+            source = local_filename
+
         if extension == 'parquet':
-            parquet_file = pq.ParquetFile(local_filename)
-            for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            parquet_file = pq.ParquetFile(source)
+            if columns is not None:
+                columns = [column for column in parquet_file.schema_arrow.names
+                           if column in columns]
+            for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
                 yield batch.to_pandas()
+        elif extension in ('csv', 'gz'):
+            # A callable skips unwanted columns while parsing and ignores missing ones
+            usecols = None if columns is None else lambda column: column in columns
+            chunks = loaders[extension](source, chunksize=chunk_size, usecols=usecols)
+            for chunk in chunks:
+                yield chunk
         else:
-            chunks = loaders[extension](local_filename, chunksize=chunk_size)
+            chunks = loaders[extension](source, chunksize=chunk_size)
             for chunk in chunks:
+                if columns is not None:
+                    chunk = chunk[[column for column in chunk.columns if column in columns]]
                 yield chunk
 
     except FileNotFoundError as exc:
@@ -199,33 +259,55 @@ def load_pandas_dataframe(filepath, chunk_size=1000):
     except Exception as exc:
         raise RuntimeError(f"Failed to load the file '{filepath}' due to: {str(exc)}") from exc
     finally:
-        obj.close()
-        obj.release_conn()
-        if 'local_filepath' in locals() and os.path.exists(local_filename):
+        if obj is not None:
+            obj.close()
+            obj.release_conn()
+        if local_filename is not None and os.path.exists(local_filename):
             os.remove(local_filename)
             logger.info(f"Removed temporary file: {local_filename}")
 
 
-def prepare_note(note_info):
+def prepare_notes(notes_df):
+    """
+    Converts a dataframe of notes into a list of documents for the NOTES collection.
+    Dates are parsed and ids are cleaned column-wise rather than row by row.
+
+    Args:
+        notes_df (pd.DataFrame): A chunk of the uploaded EMR file.
+
+    Returns:
+        list[dict]: One document per note.
+    """
     date_format = '%Y-%m-%d'
-    note_info["text_date"] = datetime.strptime(note_info["text_date"], date_format)
-    note_info["reviewed"] = False
-    note_info["text_id"] = str(note_info["text_id"]).strip()
-    note_info["patient_id"] = str(note_info["patient_id"]).strip()
-    return note_info
+    notes_df = notes_df.copy()
+    notes_df["text_date"] = pd.to_datetime(notes_df["text_date"], format=date_format)
+    notes_df["reviewed"] = False
+    notes_df["text_id"] = notes_df["text_id"].astype(str).str.strip()
+    notes_df["patient_id"] = notes_df["patient_id"].astype(str).str.strip()
+    return notes_df.to_dict("records")
 
 
 def prepare_patients(patient_ids):
-    return [str(p_id).strip() for p_id in patient_ids]
+    """
+    Cleans the patient ids of a chunk the same way as prepare_notes.
+
+    Args:
+        patient_ids (pd.Series): The patient_id column of a chunk.
+
+    Returns:
+        list[str]: The unique patient ids, in order of first appearance.
+    """
+    return patient_ids.astype(str).str.strip().unique().tolist()
 
 
-def EMR_to_mongodb(filepath, chunk_size=1000):
+def EMR_to_mongodb(filepath, chunk_size=1000, fileobj=None):
     """
     This function is used to open a file and load its contents into the MongoDB database in chunks.
 
     Args:
         filepath (str): The path to the file to load data from.
         chunk_size (int): Number of rows to process per chunk.
+        fileobj (file-like | None): The contents of the file if already available locally.
 
     Returns:
         None
@@ -234,34 +316,49 @@ def EMR_to_mongodb(filepath, chunk_size=1000):
 
     total_rows = 0
     total_chunks = 0
-    all_patient_ids = []
+    # Patients can span several chunks; a dict keeps upload order without duplicates.
+    all_patient_ids = {}
 
     try:
-        for chunk in load_pandas_dataframe(filepath, chunk_size):
-            total_chunks += 1
-            rows_in_chunk = len(chunk)
-            total_rows += rows_in_chunk
+        # Notes are inserted in the background while the next chunk is prepared,
+        # and the chunk after that is downloaded and parsed.
+        # closing() makes sure the file is cleaned up as soon as a chunk fails.
+        with ThreadPoolExecutor(max_workers=1) as insert_executor, \
+             closing(prefetch(load_pandas_dataframe(filepath, chunk_size,
+                                                    columns=NOTE_COLUMNS,
+                                                    fileobj=fileobj))) as chunks:
+            pending_insert = None
+            for chunk in chunks:
+                total_chunks += 1
+                rows_in_chunk = len(chunk)
+                total_rows += rows_in_chunk
+
+                logger.info(f"Processing chunk {total_chunks} with {rows_in_chunk} rows")
 
-            logger.info(f"Processing chunk {total_chunks} with {rows_in_chunk} rows")
+                # Prepare notes
+                notes_to_insert = prepare_notes(chunk)
 
-            # Prepare notes
-            notes_to_insert = [prepare_note(row.to_dict()) for _, row in chunk.iterrows()]
+                # Collect patient IDs
+                chunk_patient_ids = prepare_patients(chunk['patient_id'])
+                all_patient_ids.update(dict.fromkeys(chunk_patient_ids))
 
-            # Collect patient IDs
-            chunk_patient_ids = list(chunk['patient_id'].unique())
-            chunk_patient_ids = prepare_patients(chunk_patient_ids)
-            all_patient_ids.extend(chunk_patient_ids)
+                # Wait for the previous chunk before inserting this one
+                if pending_insert is not None:
+                    logger.info(f"Inserted {pending_insert.result()} notes "
+                                f"from chunk {total_chunks - 1}")
+                pending_insert = insert_executor.submit(copy_context().run,
+                                                        db.bulk_insert_notes,
+                                                        notes_to_insert)
 
-            # Bulk insert notes
-            inserted_count = db.bulk_insert_notes(notes_to_insert)
-            logger.info(f"Inserted {inserted_count} notes from chunk {total_chunks}")
+            if pending_insert is not None:
+                logger.info(f"Inserted {pending_insert.result()} notes from chunk {total_chunks}")
 
         # store NOTES_SUMMARY such as first_note_date, last_note_date, total_notes etc.
         # to use a cache
         notes_summary_count = db.update_notes_summary()
         logger.info(f"Updated {notes_summary_count} notes summary")
         # Bulk upsert patients
-        upserted_count_patients, _ = db.bulk_upsert_patients(all_patient_ids)
+        upserted_count_patients, _ = db.bulk_upsert_patients(list(all_patient_ids))
         logger.info(f"Upserted {upserted_count_patients} patients")
         logger.info(f"Completed document migration to MongoDB database. "
                     f"Total rows processed: {total_rows}, "
@@ -280,6 +377,7 @@ def upload_data():
     This is a flask function for the backend logic to upload a file to the database.
     """
     filename = None
+    uploaded_file = None
     if request.method == "POST":
         # if db.get_task(f"upload_and_process:{current_user.username}"):
         #     flash("A file is already being processed.")
@@ -302,18 +400,23 @@ def upload_data():
                 return redirect(request.url)
 
             filename = f"uploaded_files/{secure_filename(file.filename)}"
-            size = os.fstat(file.fileno()).st_size
 
             try:
+                # An unknown length streams the upload to minio in parts
+                # without measuring the spooled file first.
                 minio.put_object(g.bucket_name,
                                  filename,
-                                 file,
-                                 size,
-                                 part_size=10*1024*1024,
-                                 num_parallel_uploads=10
+                                 file.stream,
+                                 length=-1,
+                                 part_size=16*1024*1024,
+                                 num_parallel_uploads=8
                                  )
                 logger.info(f"File - {file.filename} uploaded successfully.")
                 flash(f"{filename} uploaded successfully.")
+                # The upload is still spooled locally, so load the notes from it
+                # instead of downloading it again from minio.
+                uploaded_file = file.stream
+                uploaded_file.seek(0)
             except Exception as e:
                 filename = None
                 flash(f"Failed to upload file: {str(e)}")
@@ -321,7 +424,7 @@ def upload_data():
 
         if filename:
             try:
-                EMR_to_mongodb(filename)
+                EMR_to_mongodb(filename, fileobj=uploaded_file)
                 flash(f"Data from {filename} uploaded to the database.")
                 return redirect(url_for('ops.upload_query'))
             except Exception as e:
@@ -348,21 +451,15 @@ def upload_query():
     # TODO: make regex translation using chatGPT if API is available
 
     if request.method == "GET":
-        current_query = db.get_search_query()
+        # The query text is part of the details, so the QUERY document is read once
+        query_details = db.get_search_query_details()
         return render_template("ops/upload_query.html",
-                               current_query=current_query,
+                               current_query=query_details.get("query", ""),
                                **db.get_info(),
-                               **db.get_search_query_details())
+                               **query_details)
 
     search_query = request.form.get("regex_query")
     logger.info(f"Received search query: {search_query}")
-    search_query_pattern = r'^\s*(\(\s*[a-zsA-Z0-9*?]+(\s+AND\s+[a-zA-Z0-9*?]+)*\s*\)|[a-zA-Z0-9*?]+)(\s*OR\s+(\(\s*[a-zA-Z0-9*?]+(\s+AND\s+[a-zA-Z0-9*?]+)*\s*\)|[a-zA-Z0-9*?]+))*\s*$'
-    try:
-        re.match(search_query_pattern, search_query)
-    except re.error as e:
-        flash(f"Invalid query - {e}")
-        logger.debug(f"Invalid query: {e}")
-        return render_template("ops/upload_query.html", **db.get_info())
 
     use_pines = bool(request.form.get("nlp_apply"))
     superbio_api_token = session.get('superbio_api_token')
@@ -420,16 +517,17 @@ def do_nlp_processing():
     pt_ids = db.get_patient_ids()
     superbio_api_token = session.get('superbio_api_token')
 
-    # add task to the queue
-    for patient in pt_ids:
-        flask.current_app.task_queue.enqueue(
+    # add tasks to the queue in a single redis pipeline
+    task_queue = flask.current_app.task_queue
+    task_queue.enqueue_many([
+        task_queue.prepare_data(
             nlp_processor.automatic_nlp_processor,
             args=(patient,),
             job_id=f'spacy:{patient}',
             description=f"Processing patient {patient} with spacy",
             retry=Retry(max=3),
-            on_success=Callback(callback_job_success),
-            on_failure=Callback(callback_job_failure),
+            on_success=JOB_SUCCESS_CALLBACK,
+            on_failure=JOB_FAILURE_CALLBACK,
             kwargs={
                 "user": current_user.username,
                 "job_id": f'spacy:{patient}',
@@ -437,6 +535,8 @@ def do_nlp_processing():
                 "description": f"Processing patient {patient} with spacy"
             }
         )
+        for patient in pt_ids
+    ])
     return redirect(url_for("ops.get_job_status"))
 
 
@@ -447,7 +547,7 @@ def callback_job_success(job, connection, result, *args, **kwargs):
     '''
     db.report_success(job)
 
-    if len(list(db.get_tasks_in_progress())) == 0:
+    if db.count_tasks_in_progress(limit=1) == 0:
         # Send a spin down request to the PINES Server if we are using superbio
         # This will occur when all tasks are completed
         if job.kwargs['superbio_api_token'] is not None:
@@ -460,12 +560,17 @@ def callback_job_failure(job, connection, result, *args, **kwargs):
     '''
     db.report_failure(job)
 
-    if len(list(db.get_tasks_in_progress())) == 0:
+    if db.count_tasks_in_progress(limit=1) == 0:
         # Send a spin down request to the PINES Server if we are using superbio
         # This will occur when all tasks are completed
         if job.kwargs['superbio_api_token'] is not None:
             close_pines_connection(job.kwargs['superbio_api_token'])
 
+
+JOB_SUCCESS_CALLBACK = Callback(callback_job_success)
+JOB_FAILURE_CALLBACK = Callback(callback_job_failure)
+
+
 def init_pines_connection(superbio_api_token = None):
     '''
     Initializes the PINES url in the INFO col.
@@ -551,8 +656,8 @@ def save_adjudications():
                                                 session['patient_data'])
 
     current_annotation_id = adjudication_handler.get_curr_annotation_id()
-    db.add_comment(current_annotation_id, request.form['comment'].strip())
     patient_id = session['patient_id']
+    db.add_comment(current_annotation_id, request.form['comment'].strip(), patient_id)
     skip_after_event = db.get_search_query(query_key="skip_after_event")
 
     action = request.form['submit_button']
@@ -626,15 +731,19 @@ def show_annotation():
     annotation_id = adjudication_handler.get_curr_annotation_id()
 
     annotation = db.get_annotation(annotation_id)
-    note = db.get_annotation_note(annotation_id)
+    note = db.get_annotation_note(annotation_id, annotation)
     if not note:
         flash("Annotation note not found.")
         return redirect(url_for("ops.adjudicate_records"))
 
     comments = db.get_patient_by_id(session['patient_id'])["comments"]
-    annotations_for_note = db.get_all_annotations_for_note(note["text_id"])
-    annotations_for_sentence = db.get_all_annotations_for_sentence(note["text_id"],
-                                                                   annotation["sentence_number"])
+    # Highlighting only needs the token offsets. The sentence annotations are a
+    # subset of the note annotations, so fetch the note once and filter here.
+    highlight_fields = {"_id": 0, "note_start_index": 1,
+                        "note_end_index": 1, "sentence_number": 1}
+    annotations_for_note = db.get_all_annotations_for_note(note["text_id"], highlight_fields)
+    annotations_for_sentence = [x for x in annotations_for_note
+                                if x.get("sentence_number") == annotation["sentence_number"]]
 
     annotation_data = adjudication_handler.get_annotation_details(annotation,
                                                                   note, comments,
@@ -699,7 +808,7 @@ def adjudicate_records():
             if patient is None:
                 patient_id = None
             else:
-                is_patient_locked = db.get_patient_lock_status(search_patient)
+                is_patient_locked = patient["locked"]
                 if is_patient_locked is False:
                     patient_id = patient["patient_id"]
                 else:
@@ -716,18 +825,19 @@ def adjudicate_records():
     if patient_id is None:
         return render_template("ops/annotations_complete.html", **db.get_info())
 
-    raw_annotations = db.get_all_annotations_for_patient(patient_id)
+    # Duplicate filtering and review statuses only need these fields
+    raw_annotations = db.get_all_annotations_for_patient(patient_id,
+                                                         {"note_id": 1, "sentence": 1,
+                                                          "reviewed": 1})
     hide_duplicates = db.get_search_query("hide_duplicates")
-    stored_event_date = db.get_event_date(patient_id)
-    stored_annotation_id = db.get_event_annotation_id(patient_id)
+    stored_event_date, stored_annotation_id = db.get_patient_event(patient_id)
 
     adjudication_handler = AdjudicationHandler(patient_id)
     patient_data, annotations_with_duplicates = adjudication_handler.init_patient_data(raw_annotations,
                                            hide_duplicates, stored_event_date,
                                            stored_annotation_id)
 
-    for annotation_id in annotations_with_duplicates:
-        db.mark_annotation_reviewed(annotation_id, current_user.username)
+    db.mark_annotations_reviewed(annotations_with_duplicates, current_user.username)
 
     if len(patient_data["annotation_ids"]) > 0:
         # Only lock the patient for annotation if
@@ -774,34 +884,6 @@ def unlock_current_patient():
 
     return jsonify({"error": "No patient to unlock."}), 200
 
-def get_next_annotation_index(unreviewed_annotations, current_index):
-    '''
-    Given a list of the review status of annotations and the current index
-    find the next unreviewed annotation to review.
-
-    Args :
-        - unreviewed_annotations (list[int]) : For each index, 0 indicates that an annotation is reviewed
-                                                               1 indicates that an annotation has been reviewed
-        - current_index (int) : Index of the annotation that was just reviewed,
-    
-    Returns :
-        - next_index (int) : Index of the next unreviewed annotation after the current one,
-                                will return the same index as the current index if no unreviewed annotations left.
-    
-    '''
-
-    i = current_index + 1
-    while i != current_index:
-        if i == len(unreviewed_annotations):
-            i = 0
-
-        if unreviewed_annotations[i] == 1:
-            break
-
-        i += 1
-
-    return i
-
 def get_download_filename(is_full_download=False):
     '''
     Returns the filename for a new download task.
@@ -869,10 +951,24 @@ def download_file(filename='annotations.csv'):
     file = minio.get_object(g.bucket_name, f"annotated_files/{filename}")
     logger.info(f"Downloaded annotations from s3: {filename}")
 
+    def generate():
+        # Hand the connection back to the shared minio pool once the
+        # download finishes or the client disconnects.
+        try:
+            yield from file.stream(DOWNLOAD_CHUNK_SIZE)
+        finally:
+            file.close()
+            file.release_conn()
+
+    headers = {"Content-Disposition": f"attachment;filename=cedars_{filename}"}
+    if file.headers.get("Content-Length"):
+        headers["Content-Length"] = file.headers["Content-Length"]
+
     return flask.Response(
-        file.stream(32*1024),
+        generate(),
         mimetype='text/csv',
-        headers={"Content-Disposition": f"attachment;filename=cedars_{filename}"}
+        headers=headers,
+        direct_passthrough=True
     )
 
 
@@ -929,6 +1025,36 @@ def update_results_collection():
 
     return flask.jsonify({'job_id': job.get_id()}), 202
 
+def get_job_statuses(job_ids):
+    """
+    Reads the status of several jobs in the ops queue with a single
+    round-trip to redis, without loading the job payloads.
+
+    Args:
+        job_ids (list[str]) : IDs of the jobs to check.
+    Returns:
+        statuses (dict) : Maps each job ID to 'finished', 'failed', 'in_progress',
+            or 'not_found' if the job does not exist or has expired.
+    """
+    pipe = flask.current_app.ops_queue.connection.pipeline()
+    for job_id in job_ids:
+        pipe.hget(Job.key_for(job_id), "status")
+
+    statuses = {}
+    for job_id, status in zip(job_ids, pipe.execute()):
+        if status is None:
+            statuses[job_id] = 'not_found'
+            continue
+        status = status.decode()
+        if status == JobStatus.FINISHED:
+            statuses[job_id] = 'finished'
+        elif status == JobStatus.FAILED:
+            statuses[job_id] = 'failed'
+        else:
+            statuses[job_id] = 'in_progress'
+    return statuses
+
+
 @bp.route('/check_job/<job_id>')
 @auth.admin_required
 def check_job(job_id):
@@ -936,10 +1062,36 @@ def check_job(job_id):
     Returns the status of a job to the frontend.
     """
     logger.info(f"Checking job {job_id}")
-    job = flask.current_app.ops_queue.fetch_job(job_id)
-    if job.is_finished:
+    # Only load the whole job once it is done and its result or error is needed
+    status = get_job_statuses([job_id])[job_id]
+    if status == 'finished':
+        job = flask.current_app.ops_queue.fetch_job(job_id)
         return flask.jsonify({'status': 'finished', 'result': job.result}), 200
-    elif job.is_failed:
+    elif status == 'failed':
+        job = flask.current_app.ops_queue.fetch_job(job_id)
         return flask.jsonify({'status': 'failed', 'error': str(job.exc_info)}), 500
+    elif status == 'not_found':
+        return flask.jsonify({'status': 'not_found'}), 404
     else:
         return flask.jsonify({'status': 'in_progress'}), 202
+
+
+@bp.route('/check_jobs', methods=['POST'])
+@auth.admin_required
+def check_jobs():
+    """
+    Returns the status of several jobs to the frontend in one request,
+    so a page watching many jobs polls once per interval.
+    Expects a JSON body of the form {"job_ids": [...]}.
+    """
+    job_ids = (request.get_json(silent=True) or {}).get("job_ids", [])
+    if not isinstance(job_ids, list):
+        return flask.jsonify({"error": "job_ids must be a list."}), 400
+
+    jobs = {}
+    for job_id, status in get_job_statuses([str(job_id) for job_id in job_ids]).items():
+        jobs[job_id] = {'status': status}
+        if status == 'failed':
+            job = flask.current_app.ops_queue.fetch_job(job_id)
+            jobs[job_id]['error'] = str(job.exc_info)
+    return flask.jsonify(jobs), 200
@@ -21,6 +21,10 @@ class Base:  # pylint: disable=too-few-public-methods
     SECRET_KEY = config['SECRET_KEY']
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=60)
 
+    # Passed to werkzeug's generate_password_hash when users are added
+    PASSWORD_HASH_METHOD = "scrypt"
+    PASSWORD_SALT_LENGTH = 16
+
     MONGO_URI = MONGO_URI = (
     f'mongodb://{config["DB_USER"]}:{config["DB_PWD"]}'
     f'@{config["DB_HOST"]}:{config["DB_PORT"]}/'
@@ -28,6 +32,9 @@ class Base:  # pylint: disable=too-few-public-methods
     f'{config["DB_PARAMS"]}'
     f'&maxPoolSize=50'
     f'&minPoolSize=5'
+    f'&maxIdleTimeMS=60000'
+    f'&waitQueueTimeoutMS=5000'
+    f'&compressors=zlib'
     f'&connectTimeoutMS=30000'
     f'&retryWrites=true'
     f'&socketTimeoutMS=20000'
@@ -5,6 +5,7 @@ worker_class = 'gthread'
 timeout = 300
 bind = ':5001'
 keepalive = 5
+# Keep preloading off: each worker must open its own MongoDB pool after fork.
 preload_app = False
 disable_redirect_access_to_syslog = True
 accesslog = "/dev/null"
@@ -10,7 +10,7 @@ from redis import Redis
 import fakeredis
 from flask_login import FlaskLoginClient
 from app.auth import User
-from app.ops import prepare_note
+from app.ops import prepare_notes
 
 
 load_dotenv()
@@ -39,7 +39,7 @@ def db(cedars_app):
                       cedars_version="test_version")
     db.add_user("test_user", "test_password")
     # db.upload_notes(test_data)
-    notes_to_insert = [prepare_note(row.to_dict()) for _, row in test_data.iterrows()]
+    notes_to_insert = prepare_notes(test_data)
     db.bulk_insert_notes(notes_to_insert)
 
     patient_ids = set(test_data['patient_id'])
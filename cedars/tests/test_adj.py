@@ -12,6 +12,31 @@ def test_highlighted_text(db):
     assert "<br>" in text_highlighter.get_highlighted_text(note,
                                                            annotations_for_note)
 
+
+def test_highlighted_text_keeps_spacing():
+    text_highlighter = SentenceHighlighter()
+    note = {"text": "Patient has cancer.\nNo recurrence of cancer."}
+    annotations_for_note = [{"note_start_index": 12, "note_end_index": 18},
+                            {"note_start_index": 14, "note_end_index": 18},
+                            {"note_start_index": 37, "note_end_index": 43}]
+    highlighted = text_highlighter.get_highlighted_text(note, annotations_for_note)
+    assert highlighted == ("Patient has <b><mark>cancer</mark></b>.<br>"
+                           "No recurrence of <b><mark>cancer</mark></b>.")
+
+@pytest.mark.parametrize("sentence_start", [12, 0, None])
+def test_highlighted_sentence(sentence_start):
+    text_highlighter = SentenceHighlighter()
+    note = {"text": "First line.\nPatient has Cancer.\nAnother line."}
+    annotation = {"sentence": "patient has cancer."}
+    if sentence_start is not None:
+        # 0 is a stale offset and must fall back to searching the note
+        annotation["sentence_start"] = sentence_start
+    annotations_for_sentence = [{"note_start_index": 24, "note_end_index": 30}]
+    highlighted = text_highlighter.get_highlighted_sentence(annotation, note,
+                                                            annotations_for_sentence)
+    assert highlighted == "Patient has <b><mark>Cancer</mark></b>."
+
+
 @pytest.mark.parametrize(
     "annotations, expected_indices",
     [
@@ -24,6 +49,14 @@ def test_highlighted_text(db):
             ],
             [1, 3],
         ),
+        (
+            [
+                {"sentence": "No evidence of  disease.", "_id": 1},
+                {"sentence": "No evidence of\ndisease. ", "_id": 2},  # Duplicate (whitespace)
+                {"sentence": "No evidence of disease", "_id": 3},
+            ],
+            [1],
+        ),
         (
             [
                 {"sentence": "Unique sentence.", "_id": 1},
@@ -39,6 +72,14 @@ def test_filter_duplicates_by_patient(annotations, expected_indices):
     assert result == expected_indices
 
 
+def test_pop_and_mark_duplicates():
+    strategy = AnnotationFilterStrategy()
+    annotations = [{"_id": i} for i in range(6)]
+    kept, duplicates = strategy._pop_and_mark_duplicates(annotations, [4, 1, 2])
+    assert kept == [{"_id": 0}, {"_id": 3}, {"_id": 5}]
+    assert duplicates == [1, 2, 4]
+
+
 @pytest.mark.parametrize(
     "annotations, expected_indices",
     [
@@ -217,4 +258,26 @@ def test_load_from_patient_data(
     handler = AdjudicationHandler('input_patient_id')
     handler.load_from_patient_data(input_patient_id, input_patient_data)
     assert handler.patient_id == expected_patient_id
-    assert handler.get_patient_data() == expected_patient_data
\ No newline at end of file
+    assert handler.get_patient_data() == expected_patient_data
+
+
+@pytest.mark.parametrize(
+    "review_statuses, current_index, expected_index",
+    [
+        ([ReviewStatus.UNREVIEWED] * 3, 0, 1),
+        ([ReviewStatus.UNREVIEWED, ReviewStatus.REVIEWED, ReviewStatus.UNREVIEWED], 2, 0),
+        ([ReviewStatus.UNREVIEWED, ReviewStatus.REVIEWED, ReviewStatus.REVIEWED,
+          ReviewStatus.UNREVIEWED], 0, 3),
+    ],
+)
+def test_adjudicate_annotation_next_index(review_statuses, current_index, expected_index):
+    handler = AdjudicationHandler("patient_1")
+    handler.load_from_patient_data("patient_1", {
+        'event_date': None,
+        'event_annotation_id': None,
+        'annotation_ids': [str(i) for i in range(len(review_statuses))],
+        'review_statuses': list(review_statuses),
+        'current_index': current_index,
+    })
+    handler._adjudicate_annotation()
+    assert handler.get_patient_data()['current_index'] == expected_index
@@ -29,6 +29,23 @@ def test_add_user(db):
     assert db.get_user(username) is not None
 
 
+def test_add_user_hashes_password_once(db):
+    db.add_user("hash_user", "plain_password")
+    stored_hash = db.get_user("hash_user")["password"]
+    assert stored_hash != "plain_password"
+    assert db.check_password("hash_user", "plain_password")
+
+    db.add_user("hash_user_2", stored_hash, is_hashed=True)
+    assert db.get_user("hash_user_2")["password"] == stored_hash
+
+    # A password that looks like a hash is still hashed
+    db.add_user("hash_user_3", "pbkdf2:a$b$0f")
+    assert db.get_user("hash_user_3")["password"] != "pbkdf2:a$b$0f"
+    assert db.check_password("hash_user_3", "pbkdf2:a$b$0f")
+    db.mongo.db["USERS"].delete_many({"user": {"$in": ["hash_user", "hash_user_2",
+                                                       "hash_user_3"]}})
+
+
 def test_save_query(db):
     tag_query = {
         "exact": False,
@@ -115,6 +132,10 @@ def test_get_all_annotations_for_patient(db):
     result = db.get_all_annotations_for_patient("1111111111")
     assert len(result) == 3
 
+    result = db.get_all_annotations_for_patient("1111111111", {"sentence": 1})
+    assert len(result) == 3
+    assert set(result[0].keys()) == {"_id", "sentence"}
+
 
 def test_get_all_annotations_for_patient_paged(db):
     result = db.get_all_annotations_for_patient_paged("1111111111", page=1, page_size=1)
@@ -142,7 +163,7 @@ def test_get_last_note_date_for_patient(db):
 
 
 def test_get_all_annotations(db):
-    assert len(db.get_all_annotations()) == 3
+    assert len(list(db.get_all_annotations())) == 3
 
 
 def test_get_proj_name(db):
@@ -153,6 +174,27 @@ def test_get_curr_version(db):
     assert db.get_curr_version() == "test_version"
 
 
+def test_update_project_name_refreshes_info(db):
+    old_name = db.get_proj_name()
+    db.update_project_name("renamed_project")
+    assert db.get_proj_name() == "renamed_project"
+    assert db.get_info()["project"] == "renamed_project"
+    db.update_project_name(old_name)
+    assert db.get_proj_name() == old_name
+
+
+def test_info_cache_expires(db):
+    old_name = db.get_info()["project"]
+    # Another process updates INFO, this process's cache is not cleared
+    db.mongo.db["INFO"].update_one({}, {"$set": {"project": "other_process"}})
+    assert db.get_info()["project"] == old_name
+    with patch.object(db.time, "monotonic",
+                      return_value=db.time.monotonic() + db.INFO_CACHE_SECONDS):
+        assert db.get_info()["project"] == "other_process"
+    db.update_project_name(old_name)
+    assert db.get_info()["project"] == old_name
+
+
 def test_get_project_users(db):
     assert len(db.get_project_users()) == 2
     assert "test1" in db.get_project_users()
@@ -228,6 +270,12 @@ def test_update_event_annotation_id(db):
     event_anno_id = db.get_event_annotation_id(patient_id)
     assert anno_id == event_anno_id
 
+def test_get_patient_event(db):
+    patient_id = "1111111111"
+    assert db.get_patient_event(patient_id) == (db.get_event_date(patient_id),
+                                                db.get_event_annotation_id(patient_id))
+    assert db.get_patient_event("NO_SUCH_PATIENT") == (None, None)
+
 def test_delete_event_annotation_id(db):
     patient_id = "1111111111"
     db.delete_event_annotation_id(patient_id)
@@ -262,6 +310,12 @@ def test_mark_note_reviewed(db):
     assert note["reviewed_by"] == "test1"
 
 
+def test_get_patient_notes_projection_and_limit(db):
+    notes = list(db.get_patient_notes("1111111111", reviewed=True,
+                                      projection={"_id": 0, "text_id": 1}, limit=1))
+    assert notes == [{"text_id": "UNIQUE0000000001"}]
+
+
 def test_add_comment(db):
     note_id = "UNIQUE0000000001"
     annot = db.get_all_annotations_for_note(note_id)[0]
@@ -318,3 +372,137 @@ def test_get_curr_stats(db):
     assert stats["number_of_patients"] == 5
     assert stats["number_of_annotated_patients"] == 0
     assert stats["number_of_reviewed"] == 1
+
+
+def test_bulk_insert_notes_skips_duplicates(db):
+    note = db.get_all_notes("1111111111")[0]
+    note.pop("_id")
+    assert db.bulk_insert_notes([note]) == 0
+    assert len(db.get_all_notes("1111111111")) == 12
+
+
+def test_mark_annotations_reviewed(db):
+    note_ids = ["UNIQUE0000000002", "UNIQUE0000000003"]
+    for note_id in note_ids:
+        db.insert_one_annotation({"note_id": note_id, "patient_id": "1111111111",
+                                  "reviewed": 0, "isNegated": False})
+    db.insert_one_annotation({"note_id": note_ids[1], "patient_id": "1111111111",
+                              "reviewed": 0, "isNegated": False})
+    annotations = db.mongo.db["ANNOTATIONS"].find({"note_id": {"$in": note_ids}})
+    first_annotations = {}
+    for annotation in annotations:
+        first_annotations.setdefault(annotation["note_id"], str(annotation["_id"]))
+
+    db.mark_annotations_reviewed(list(first_annotations.values()), "test1")
+
+    notes = {note["text_id"]: note for note in db.get_all_notes("1111111111")}
+    assert notes[note_ids[0]]["reviewed"] is True
+    assert notes[note_ids[1]]["reviewed"] is False
+    assert db.mongo.db["ANNOTATIONS"].count_documents({"note_id": {"$in": note_ids},
+                                                       "reviewed": 1}) == 2
+    db.mongo.db["ANNOTATIONS"].delete_many({"note_id": {"$in": note_ids}})
+    db.mongo.db["NOTES"].update_many({"text_id": {"$in": note_ids}},
+                                     {"$set": {"reviewed": False}})
+
+
+def test_get_annotated_notes_for_patient_order(db):
+    patient_id = "5555555555"
+    annotations = [("NOTE_B", datetime(2020, 1, 2), 5),
+                   ("NOTE_A", datetime(2020, 1, 2), 1),
+                   ("NOTE_B", datetime(2020, 1, 2), 1),
+                   ("NOTE_C", datetime(2020, 1, 1), 3)]
+    for note_id, text_date, start in annotations:
+        db.insert_one_annotation({"patient_id": patient_id, "note_id": note_id,
+                                  "text_date": text_date, "note_start_index": start})
+    assert db.get_annotated_notes_for_patient(patient_id) == ["NOTE_C", "NOTE_A", "NOTE_B"]
+    db.mongo.db["ANNOTATIONS"].delete_many({"patient_id": patient_id})
+
+
+def test_get_note_predictions_by_hash(db):
+    text_hash = db.hash_note_text("identical note text")
+    assert db.get_note_predictions_by_hash([text_hash]) == {}
+    db.mongo.db["PINES"].insert_one({"text_id": "HASHED_NOTE", "text_hash": text_hash,
+                                     "predicted_score": 0.75})
+    assert db.get_note_predictions_by_hash([db.hash_note_text("identical  note\ntext "),
+                                            db.hash_note_text("other note text")]) == {
+        text_hash: 0.75}
+    db.mongo.db["PINES"].delete_one({"text_id": "HASHED_NOTE"})
+
+
+def test_get_all_annotations_for_note_order(db):
+    note_id = "ORDERED_NOTE"
+    for start in [30, 10, 20]:
+        db.insert_one_annotation({"note_id": note_id, "isNegated": False,
+                                  "text_date": datetime(2020, 1, 1),
+                                  "note_start_index": start, "note_end_index": start + 5})
+    annotations = db.get_all_annotations_for_note(note_id, {"_id": 0, "note_start_index": 1})
+    assert annotations == [{"note_start_index": 10}, {"note_start_index": 20},
+                           {"note_start_index": 30}]
+    db.mongo.db["ANNOTATIONS"].delete_many({"note_id": note_id})
+
+
+def test_predict_and_save(db):
+    # Predictions need a PINES url before any note is read
+    with patch.object(db, "get_pines_url", return_value=None), \
+         patch.object(db, "get_prediction") as mock_prediction:
+        with pytest.raises(ValueError):
+            db.predict_and_save()
+        mock_prediction.assert_not_called()
+
+    with patch.object(db, "get_pines_url", return_value="http://pines"):
+        note_ids = [note["text_id"] for note in db.get_all_notes("1111111111")]
+        # Unpredicted notes are read one chunk of ids at a time
+        with patch.object(db, "get_prediction", return_value=0.456) as mock_prediction, \
+             patch.object(db, "PINES_CHUNK_SIZE", 1):
+            db.predict_and_save(note_ids)
+            assert mock_prediction.call_count > 0
+        for note_id in note_ids:
+            assert db.get_note_prediction_from_db(note_id) == 0.46
+        assert db.get_note_predictions_from_db(note_ids + ["missing"]) == {
+            note_id: 0.46 for note_id in note_ids}
+
+        # Notes that already have a prediction are not sent to PINES again
+        with patch.object(db, "get_prediction") as mock_prediction:
+            db.predict_and_save(note_ids)
+            mock_prediction.assert_not_called()
+        assert db.mongo.db["PINES"].count_documents({"text_id": {"$in": note_ids}}) == len(note_ids)
+
+        # Only notes missing a prediction are read again
+        db.mongo.db["PINES"].delete_one({"text_id": note_ids[0]})
+        with patch.object(db, "get_prediction", return_value=0.456) as mock_prediction, \
+             patch.object(db, "PINES_CHUNK_SIZE", 1):
+            db.predict_and_save(note_ids)
+        assert db.get_note_prediction_from_db(note_ids[0]) == 0.46
+        assert db.mongo.db["PINES"].count_documents({"text_id": {"$in": note_ids}}) == len(note_ids)
+
+        # Forcing an update replaces the stored scores instead of adding rows
+        with patch.object(db, "get_prediction", return_value=0.1):
+            db.predict_and_save(note_ids, force_update=True)
+        assert db.mongo.db["PINES"].count_documents({"text_id": {"$in": note_ids}}) == len(note_ids)
+        assert db.get_note_prediction_from_db(note_ids[0]) == 0.1
+        db.mongo.db["PINES"].delete_many({"text_id": {"$in": note_ids}})
+
+
+def test_round_pines_scores(db):
+    db.mongo.db["PINES"].insert_many([{"text_id": "LEGACY_1", "predicted_score": 0.4567},
+                                      {"text_id": "LEGACY_2", "predicted_score": 0.5}])
+    # Scores saved before rounding are still rounded when read
+    assert db.get_note_prediction_from_db("LEGACY_1") == 0.46
+    assert db.get_note_predictions_from_db(["LEGACY_1", "LEGACY_2"]) == {
+        "LEGACY_1": 0.46, "LEGACY_2": 0.5}
+
+    assert db.round_pines_scores() == 1
+    stored = db.mongo.db["PINES"].find_one({"text_id": "LEGACY_1"})
+    assert stored["predicted_score"] == 0.46
+    assert db.round_pines_scores() == 0
+    db.mongo.db["PINES"].delete_many({"text_id": {"$in": ["LEGACY_1", "LEGACY_2"]}})
+
+
+def test_count_tasks_in_progress(db):
+    in_progress = db.count_tasks_in_progress()
+    db.mongo.db["TASK"].insert_many([{"job_id": "count_task_1", "complete": False},
+                                     {"job_id": "count_task_2", "complete": False},
+                                     {"job_id": "count_task_3", "complete": True}])
+    assert db.count_tasks_in_progress() == in_progress + 2
+    assert db.count_tasks_in_progress(limit=1) == 1
+    db.mongo.db["TASK"].delete_many({"job_id": {"$regex": "^count_task_"}})
@@ -6,3 +6,19 @@ Pytests
 def test_config(cedars_app):
     with cedars_app.app_context():
         assert cedars_app.testing is True
+
+
+def test_create_indexes_command(runner, db):
+    result = runner.invoke(args=["create-indexes"])
+    assert result.exit_code == 0
+    index_names = db.mongo.db["PINES"].index_information()
+    assert "text_id_1" in index_names
+
+
+def test_create_db_indices_logs_failures(db):
+    from unittest.mock import patch
+    from pymongo.errors import OperationFailure
+    with patch.object(db, "create_collection_indices",
+                      side_effect=OperationFailure("IndexOptionsConflict")) as mock_create:
+        db.create_db_indices()
+    assert mock_create.call_count == len(db.DB_INDEXES)
@@ -1,8 +1,14 @@
 from unittest.mock import patch
 import pytest
+import pandas as pd
 from flask import request
 from app.ops import (
-    allowed_data_file
+    allowed_data_file,
+    get_job_statuses,
+    load_pandas_dataframe,
+    NOTE_COLUMNS,
+    prefetch,
+    prepare_patients
 )
 from app.stats import _elements_to_int
 
@@ -15,9 +21,54 @@ def test_allowed_data_file():
     assert allowed_data_file("file.pickle") is True
     assert allowed_data_file("file.pkl") is True
     assert allowed_data_file("file.xml") is True
+    assert allowed_data_file("file.csv.gz") is True
+    assert allowed_data_file("FILE.CSV") is True
     assert allowed_data_file("file.txt") is False
 
 
+@pytest.mark.parametrize("filename", ["tests/simulated_patients.csv",
+                                      "tests/simulated_patients.csv.gz",
+                                      "tests/simulated_patients.parquet"])
+def test_load_pandas_dataframe_from_fileobj(filename):
+    with open(filename, "rb") as fileobj:
+        chunks = list(load_pandas_dataframe(filename, 50, NOTE_COLUMNS, fileobj=fileobj))
+    assert sum(len(chunk) for chunk in chunks) == 103
+    assert set(chunks[0].columns) <= set(NOTE_COLUMNS)
+
+
+def test_prepare_patients():
+    patient_ids = pd.Series([22, " 11", "11 ", 22, "33"])
+    assert prepare_patients(patient_ids) == ["22", "11", "33"]
+
+
+def test_prefetch():
+    assert list(prefetch(range(5))) == [0, 1, 2, 3, 4]
+    assert list(prefetch([])) == []
+
+    def failing_chunks():
+        yield 1
+        raise ValueError("bad chunk")
+
+    with pytest.raises(ValueError):
+        list(prefetch(failing_chunks()))
+
+    # The wrapped generator is closed when the consumer stops early
+    cleaned_up = []
+
+    def chunks_with_cleanup():
+        try:
+            yield from range(5)
+        finally:
+            cleaned_up.append(True)
+
+    # Keep a reference so cleanup cannot come from garbage collection
+    inner = chunks_with_cleanup()
+    chunks = prefetch(inner)
+    assert next(chunks) == 0
+    chunks.close()
+    assert cleaned_up == [True]
+
+
 @pytest.mark.parametrize("project_name, project_id", [
     ("Test Project", None),
     ("Updated Project", 1)
@@ -140,6 +191,36 @@ def test_get_job_status(client, db):
     assert response.status_code == 200
 
 
+def test_get_job_statuses(cedars_app):
+    from rq.job import Job, JobStatus
+    connection = cedars_app.ops_queue.connection
+    finished = Job.create(print, connection=connection)
+    finished.set_status(JobStatus.FINISHED)
+    queued = Job.create(print, connection=connection)
+    queued.set_status(JobStatus.QUEUED)
+
+    statuses = get_job_statuses([finished.id, queued.id, "missing"])
+    assert statuses == {finished.id: "finished",
+                        queued.id: "in_progress",
+                        "missing": "not_found"}
+
+
+def test_check_jobs(cedars_app):
+    from rq.job import Job, JobStatus
+    from app.ops import check_jobs
+    connection = cedars_app.ops_queue.connection
+    finished = Job.create(print, connection=connection)
+    finished.set_status(JobStatus.FINISHED)
+
+    with cedars_app.test_request_context(json={"job_ids": [finished.id, "missing"]}), \
+         patch("app.auth.current_user") as mock_user:
+        mock_user.is_admin = True
+        response, status_code = check_jobs()
+    assert status_code == 200
+    assert response.get_json() == {finished.id: {"status": "finished"},
+                                   "missing": {"status": "not_found"}}
+
+
 # def test_save_adjudications_update_date(client, db):
 #     nlp = nlpprocessor.NlpProcessor()
 #     nlp.process_notes(patient_id=1111111111)